@@ -1,14 +1,17 @@
 import discord
 from discord import app_commands
 import os
-import json
 from datetime import datetime
+from file_access import file_access
+
+# 開発者（Botの運営者）のユーザーID
+DEVELOPER_ID = 742627994958561302
 
 
 class AboutCommands:
     def __init__(self):
         # Botの説明文
-        self.bot_description = """
+        self.bot_description = f"""
 
 このBotはゼミグループ用に開発された専用Botです。
 ゼミ日程の管理、ミニゲーム、サーバー統計など様々な機能を提供します。
@@ -22,7 +25,7 @@ class AboutCommands:
 • 問い合わせ機能（開発者へのDM送信）
 
 **【問い合わせ先】**
-バグ報告や機能提案がございましたら、開発者 <@742627994958561302> までご連絡ください。
+バグ報告や機能提案がございましたら、開発者 <@{DEVELOPER_ID}> までご連絡ください。
 
 **【開発情報】**
 開発: Hamaryo-Space
@@ -47,12 +50,11 @@ class AboutCommands:
             # 設定ファイルがあればバージョン情報を読み込む
             base_dir = os.path.dirname(os.path.abspath(__file__))
             config_path = os.path.join(base_dir, "config.json")
-            with open(config_path, "r", encoding="utf-8") as f:
-                config = json.load(f)
-                if "version" in config:
-                    embed.add_field(
-                        name="バージョン", value=f"v{config['version']}", inline=True
-                    )
+            config = await file_access.read_json(config_path)
+            if "version" in config:
+                embed.add_field(
+                    name="バージョン", value=f"v{config['version']}", inline=True
+                )
         except:
             pass
 
@@ -99,7 +101,7 @@ class AboutCommands:
         """開発者への問い合わせや機能提案を送信します"""
         embed = discord.Embed(
             title="問い合わせ内容を送信しました",
-            description=f"以下の内容で開発者 <@742627994958561302> に通知されます。返信をお待ちください。",
+            description=f"以下の内容で開発者 <@{DEVELOPER_ID}> に通知されます。返信をお待ちください。",
             color=discord.Color.green(),
         )
 
@@ -120,9 +122,7 @@ class AboutCommands:
 
         # 開発者にDMを送信
         try:
-            # 開発者のIDを指定
-            developer_id = 742627994958561302
-            developer_user = await interaction.client.fetch_user(developer_id)
+            developer_user = await interaction.client.fetch_user(DEVELOPER_ID)
 
             # 開発者へのDM用Embed作成
             dev_embed = discord.Embed(
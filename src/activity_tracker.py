@@ -0,0 +1,155 @@
+import discord
+import heapq
+import random
+from array import array
+from collections import Counter
+
+# Count-Min Sketchの幅と段数（サーバーごとのメモリ量はこれで固定される）
+SKETCH_WIDTH = 512
+SKETCH_DEPTH = 4
+# ハッシュ値を64ビットに収めるためのマスク
+MASK64 = (1 << 64) - 1
+# 上位候補として保持するアクティビティの数
+MAX_CANDIDATES = 32
+
+# 集計するアクティビティの種類と表示用の記号
+ACTIVITY_KINDS = {
+    "playing": "🎮",
+    "streaming": "📹",
+    "listening": "🎵",
+}
+
+
+# メンバーのアクティビティを (種類, 名前) の集合で返す関数
+def activity_keys(member):
+    keys = set()
+    for activity in member.activities:
+        if isinstance(activity, discord.Spotify):
+            keys.add(("listening", activity.artist or activity.title))
+        elif isinstance(activity, discord.Streaming):
+            keys.add(("streaming", activity.game or activity.name))
+        elif activity.type == discord.ActivityType.playing and activity.name:
+            keys.add(("playing", activity.name))
+    return keys
+
+
+# 表示用のアクティビティ名を返す関数
+def activity_label(key):
+    kind, name = key
+    return f"{ACTIVITY_KINDS[kind]} {name}"
+
+
+# 増減に対応したCount-Min Sketch（値は実際の人数以上になる）
+class CountMinSketch:
+    def __init__(self, width=SKETCH_WIDTH, depth=SKETCH_DEPTH):
+        self.width = width
+        self.depth = depth
+        self._table = array("l", [0]) * (width * depth)
+        # 段ごとに別の奇数を掛けて、段の間で枠の衝突が重ならないようにする
+        seeds = random.Random(0)
+        self._multipliers = [seeds.getrandbits(64) | 1 for _ in range(depth)]
+
+    def _cells(self, key):
+        hashed = hash(key) & MASK64
+        for row, multiplier in enumerate(self._multipliers):
+            mixed = (hashed * multiplier) & MASK64
+            yield row * self.width + ((mixed * self.width) >> 64)
+
+    def add(self, key, count=1):
+        """keyの人数を加算し、加算後の推定値を返します"""
+        estimate = None
+        for cell in self._cells(key):
+            self._table[cell] += count
+            value = self._table[cell]
+            estimate = value if estimate is None else min(estimate, value)
+        return estimate
+
+    def estimate(self, key):
+        """keyの推定人数を返します"""
+        return min(self._table[cell] for cell in self._cells(key))
+
+
+# 1サーバー分のアクティビティの集計（メモリ量は種類数によらず一定）
+class GuildActivities:
+    def __init__(self, members, max_candidates=MAX_CANDIDATES):
+        self.max_candidates = max_candidates
+        self.sketch = CountMinSketch()
+        self.candidates = {}  # 上位候補 key -> 推定人数
+        self.kind_counts = Counter({kind: 0 for kind in ACTIVITY_KINDS})
+        # メンバーキャッシュを1回だけ走査して初期値を作る
+        for member in members:
+            self.apply(activity_keys(member), 1)
+
+    def apply(self, keys, sign):
+        """アクティビティの人数を加算（sign=-1で減算）します"""
+        for key in keys:
+            self.kind_counts[key[0]] += sign
+            estimate = self.sketch.add(key, sign)
+            if key in self.candidates:
+                self.candidates[key] = estimate
+            elif sign > 0:
+                self._offer(key, estimate)
+
+    def _offer(self, key, estimate):
+        # 候補に空きがあればそのまま入れ、無ければ最も少ない候補と入れ替える
+        if len(self.candidates) < self.max_candidates:
+            self.candidates[key] = estimate
+            return
+        weakest = min(self.candidates, key=self.candidates.get)
+        if estimate > self.candidates[weakest]:
+            del self.candidates[weakest]
+            self.candidates[key] = estimate
+
+    def top(self, n):
+        """人数の多いアクティビティ上位n件を (表示名, 人数) のリストで返します"""
+        # 候補の人数は他のアクティビティの増減で変わり得るので、ここで推定し直す
+        for key in self.candidates:
+            self.candidates[key] = self.sketch.estimate(key)
+        top = heapq.nlargest(
+            n,
+            ((key, count) for key, count in self.candidates.items() if count > 0),
+            key=lambda item: item[1],
+        )
+        return [(activity_label(key), count) for key, count in top]
+
+
+# サーバーごとのアクティビティをプレゼンス更新で集計し続けるクラス
+class ActivityTracker:
+    def __init__(self):
+        self._guilds = {}  # guild_id -> GuildActivities
+
+    def reset(self):
+        """全ての集計を破棄します（次回の参照時に作り直します）"""
+        self._guilds.clear()
+
+    def forget_guild(self, guild_id):
+        """サーバーの集計を破棄します"""
+        self._guilds.pop(guild_id, None)
+
+    def on_member_join(self, member):
+        activities = self._guilds.get(member.guild.id)
+        if activities is not None:
+            activities.apply(activity_keys(member), 1)
+
+    def on_member_remove(self, member):
+        activities = self._guilds.get(member.guild.id)
+        if activities is not None:
+            activities.apply(activity_keys(member), -1)
+
+    def on_presence_update(self, before, after):
+        activities = self._guilds.get(after.guild.id)
+        if activities is None:
+            return
+        # 始めた・やめたアクティビティの差分だけを反映する
+        before_keys = activity_keys(before)
+        after_keys = activity_keys(after)
+        if before_keys != after_keys:
+            activities.apply(before_keys - after_keys, -1)
+            activities.apply(after_keys - before_keys, 1)
+
+    def get(self, guild):
+        """サーバーの集計を返します（初回はメンバーキャッシュから作成します）"""
+        activities = self._guilds.get(guild.id)
+        if activities is None:
+            activities = self._guilds[guild.id] = GuildActivities(guild.members)
+        return activities
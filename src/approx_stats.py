@@ -0,0 +1,227 @@
+import hashlib
+import heapq
+import math
+from collections import Counter
+from activity_tracker import activity_keys, activity_label
+from member_counters import STATUS_LABELS, member_role_ids, member_state
+
+# サンプルとして保持するメンバー数
+SAMPLE_SIZE = 4096
+# HyperLogLogのレジスタ数（2のHLL_PRECISION乗、誤差は約1.04/√レジスタ数）
+HLL_PRECISION = 12
+# 推定の誤差範囲に使う信頼係数（95%）
+Z_95 = 1.96
+
+
+# メンバーIDなどから偏りのない64ビットのハッシュ値を返す関数
+def hash64(value):
+    digest = hashlib.blake2b(str(value).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+# 異なる値の数を一定のメモリで推定するHyperLogLog
+class HyperLogLog:
+    def __init__(self, precision=HLL_PRECISION):
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = bytearray(self.size)
+
+    def add(self, value):
+        hashed = hash64(value)
+        index = hashed >> (64 - self.precision)
+        rest = hashed & ((1 << (64 - self.precision)) - 1)
+        # 残りのビットの先頭から最初に1が現れる位置
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self):
+        """異なる値の数の推定値を返します"""
+        alpha = 0.7213 / (1 + 1.079 / self.size)
+        estimate = alpha * self.size**2 / sum(2.0**-r for r in self.registers)
+        zeros = self.registers.count(0)
+        # 値が少ない場合は空のレジスタの数から推定する
+        if estimate <= 2.5 * self.size and zeros:
+            estimate = self.size * math.log(self.size / zeros)
+        return round(estimate)
+
+    @property
+    def relative_error(self):
+        return 1.04 / math.sqrt(self.size)
+
+
+# メンバーの一様なサンプル（リザーバサンプリング）
+# メンバーIDのハッシュ値が小さい順にsize人を残すので、
+# 同じメンバーがイベントに何度現れてもサンプルが偏らない
+class MemberSample:
+    def __init__(self, size=SAMPLE_SIZE):
+        self.size = size
+        self._heap = []  # (-ハッシュ値, メンバーID) の最大ヒープ
+        self.states = {}  # メンバーID -> (集計用の状態, アクティビティ, ロールID)
+
+    def offer(self, member):
+        """メンバーをサンプルの候補にします（サンプル内のメンバーは状態を更新します）"""
+        if member.id in self.states:
+            self.states[member.id] = self._state(member)
+            return
+        priority = hash64(member.id)
+        if len(self._heap) < self.size:
+            heapq.heappush(self._heap, (-priority, member.id))
+        elif priority < -self._heap[0][0]:
+            _, evicted = heapq.heapreplace(self._heap, (-priority, member.id))
+            del self.states[evicted]
+        else:
+            return
+        self.states[member.id] = self._state(member)
+
+    def remove(self, member_id):
+        """退出したメンバーをサンプルから除きます"""
+        if self.states.pop(member_id, None) is not None:
+            self._heap = [item for item in self._heap if item[1] != member_id]
+            heapq.heapify(self._heap)
+
+    @staticmethod
+    def _state(member):
+        return (member_state(member), activity_keys(member), member_role_ids(member))
+
+    def __len__(self):
+        return len(self.states)
+
+
+# サンプル中の割合から母集団での人数と誤差（95%信頼区間の幅の半分）を推定する関数
+# サンプルはキャッシュ済みのメンバーから選ぶため、母集団もキャッシュ済みのメンバーにする
+# （大規模なサーバーのキャッシュはオンラインのメンバーに偏るので、サーバー全体の推定にはならない）
+def estimate_count(count, sample_size, population):
+    if sample_size == 0:
+        return 0, population
+    share = count / sample_size
+    # 有限母集団修正（サンプルがキャッシュ全体に近いほど誤差は小さくなる）
+    correction = (
+        math.sqrt((population - sample_size) / (population - 1))
+        if population > sample_size
+        else 0.0
+    )
+    margin = Z_95 * math.sqrt(share * (1 - share) / sample_size) * correction
+    return round(share * population), round(margin * population)
+
+
+# 1サーバー分の近似統計
+class GuildApproxStats:
+    def __init__(self, members, sample_size=SAMPLE_SIZE):
+        self.sample = MemberSample(sample_size)
+        self.activity_names = HyperLogLog()
+        # キャッシュにいるメンバーを1回だけ走査して初期値を作る
+        for member in members:
+            self.observe(member)
+
+    def observe(self, member):
+        self.sample.offer(member)
+        for key in activity_keys(member):
+            self.activity_names.add(key)
+
+    def member_stats(self, population):
+        """メンバー数の推定値と誤差を返します"""
+        n = len(self.sample)
+        counts = Counter()
+        status_counts = Counter({label: 0 for label in STATUS_LABELS.values()})
+        for (bot, status, mobile), _, _ in self.sample.states.values():
+            counts["bots" if bot else "humans"] += 1
+            counts["mobile_users"] += mobile
+            status_counts[status] += 1
+
+        estimates, margins = {}, {}
+        for key in ("humans", "bots", "mobile_users"):
+            estimates[key], margins[key] = estimate_count(counts[key], n, population)
+        for label, count in status_counts.items():
+            estimates[label], margins[label] = estimate_count(count, n, population)
+        return estimates, margins, n
+
+    def top(self, population, n, key_func):
+        """サンプル中で多い項目の上位n件を (項目, 推定人数) のリストで返します"""
+        counter = Counter()
+        for state in self.sample.states.values():
+            counter.update(key_func(state))
+        top = heapq.nlargest(n, counter.items(), key=lambda item: item[1])
+        size = len(self.sample)
+        return [(key, estimate_count(count, size, population)[0]) for key, count in top]
+
+
+# 大規模なサーバーの統計をサンプルとスケッチで推定するクラス
+class ApproxStats:
+    def __init__(self, sample_size=SAMPLE_SIZE):
+        self.sample_size = sample_size
+        self._guilds = {}  # guild_id -> GuildApproxStats
+
+    def reset(self):
+        self._guilds.clear()
+
+    def forget_guild(self, guild_id):
+        self._guilds.pop(guild_id, None)
+
+    def observe(self, member):
+        """イベントで見かけたメンバーを集計に反映します"""
+        stats = self._guilds.get(member.guild.id)
+        if stats is not None:
+            stats.observe(member)
+
+    def on_member_remove(self, member):
+        stats = self._guilds.get(member.guild.id)
+        if stats is not None:
+            stats.sample.remove(member.id)
+
+    def get(self, guild):
+        """サーバーの近似統計を返します（初回はメンバーキャッシュから作成します）"""
+        stats = self._guilds.get(guild.id)
+        if stats is None:
+            stats = self._guilds[guild.id] = GuildApproxStats(
+                guild.members, self.sample_size
+            )
+        return stats
+
+    def member_stats(self, guild):
+        """get_member_statsと同じ形式で、キャッシュ済みのメンバー数の推定値を返します"""
+        stats = self.get(guild)
+        population = len(guild.members)
+        estimates, margins, sample_size = stats.member_stats(population)
+        status_counts = {label: estimates[label] for label in STATUS_LABELS.values()}
+        return {
+            "total": guild.member_count or population,
+            "humans": estimates["humans"],
+            "bots": estimates["bots"],
+            "online": status_counts["オンライン"],
+            "offline": status_counts["オフライン"],
+            "status_counts": status_counts,
+            "mobile_users": estimates["mobile_users"],
+            "approximate": True,
+            "cached_members": population,
+            "sample_size": sample_size,
+            "margins": {
+                "humans": margins["humans"],
+                "bots": margins["bots"],
+                "online": margins["オンライン"],
+                "mobile_users": margins["mobile_users"],
+            },
+        }
+
+    def top_roles(self, guild, n, names):
+        """ロールの推定人数の上位n件を (ロール名, 推定人数) のリストで返します"""
+        stats = self.get(guild)
+        population = len(guild.members)
+        top = stats.top(
+            population,
+            n,
+            lambda state: [role_id for role_id in state[2] if role_id in names],
+        )
+        return [(names[role_id], count) for role_id, count in top]
+
+    def activity_stats(self, guild, n):
+        """get_activity_statsと同じ形式でアクティビティの推定値を返します"""
+        stats = self.get(guild)
+        population = len(guild.members)
+        top = stats.top(population, n, lambda state: state[1])
+        return {
+            "popular_activities": [(activity_label(key), count) for key, count in top],
+            "distinct_activities": stats.activity_names.count(),
+            "distinct_error": stats.activity_names.relative_error,
+            "approximate": True,
+        }
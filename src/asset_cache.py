@@ -0,0 +1,101 @@
+import hashlib
+import io
+import os
+import time
+import discord
+from urllib.parse import parse_qs, urlparse
+from file_access import file_access
+
+# アップロード済みURLの保存先
+URL_CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "Public", "asset_cache.json"
+)
+# URLの有効期限のこの秒数前には再アップロードする
+EXPIRY_MARGIN_SECONDS = 3600
+
+
+# メモリ上に読み込んだ画像ファイル
+class ImageAsset:
+    def __init__(self, name, path, filename, data, signature):
+        self.name = name
+        self.path = path
+        self.filename = filename
+        self.data = data
+        self.signature = signature
+        self.sha256 = hashlib.sha256(data).hexdigest()
+
+    def to_file(self):
+        """discord.Fileを返します"""
+        # bytesから作ったBytesIOは書き込むまで元のバッファを共有するため、コピーは発生しない
+        return discord.File(io.BytesIO(self.data), filename=self.filename)
+
+
+# DiscordのCDNのURLから有効期限（UNIX時間）を取り出す関数
+def url_expiry(url):
+    expires = parse_qs(urlparse(url).query).get("ex")
+    if not expires:
+        return None
+    try:
+        return int(expires[0], 16)
+    except ValueError:
+        return None
+
+
+# 画像をメモリに保持し、アップロード済みのURLを記録するキャッシュ
+class AssetCache:
+    def __init__(self, url_cache_path=URL_CACHE_PATH):
+        self.url_cache_path = url_cache_path
+        self._assets = {}  # name -> ImageAsset
+        self._urls = None  # name -> {"sha256": str, "url": str, "expires": int | None}
+
+    async def _load_urls(self):
+        if self._urls is None:
+            try:
+                self._urls = await file_access.read_json(self.url_cache_path)
+            except (FileNotFoundError, ValueError):
+                self._urls = {}
+
+    async def get(self, name, path, filename):
+        """画像を返します（ファイルが変わった時だけ読み直します）"""
+        stat = await file_access.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        asset = self._assets.get(name)
+        if asset is None or asset.signature != signature or asset.path != path:
+            data = await file_access.read_bytes(path)
+            asset = ImageAsset(name, path, filename, data, signature)
+            self._assets[name] = asset
+        return asset
+
+    async def cached_url(self, asset):
+        """アップロード済みで有効なURLがあれば返します"""
+        await self._load_urls()
+        cached = self._urls.get(asset.name)
+        if not cached or cached["sha256"] != asset.sha256:
+            return None
+        expires = cached.get("expires")
+        if expires is not None and expires - EXPIRY_MARGIN_SECONDS <= time.time():
+            return None
+        return cached["url"]
+
+    async def remember(self, message, assets):
+        """送信したメッセージの添付ファイルのURLを記録します"""
+        await self._load_urls()
+        urls = {
+            attachment.filename: attachment.url for attachment in message.attachments
+        }
+        changed = False
+        for asset in assets:
+            url = urls.get(asset.filename)
+            if url:
+                self._urls[asset.name] = {
+                    "sha256": asset.sha256,
+                    "url": url,
+                    "expires": url_expiry(url),
+                }
+                changed = True
+        if changed:
+            await file_access.write_json(self.url_cache_path, self._urls)
+
+
+# 共有のキャッシュ
+asset_cache = AssetCache()
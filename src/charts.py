@@ -0,0 +1,262 @@
+import glob
+import io
+import math
+import os
+import threading
+
+# グラフの描画はoffloadのワーカー内で行う
+# pyplotのグローバルな状態（plt.rcParamsなど）は使わず、Figureを直接操作する
+
+# 同梱する日本語フォントの置き場所（.ttf/.otf/.ttcを置くと最優先で使う）
+FONT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Public", "fonts")
+# 同梱フォントがない場合に探すシステムの日本語フォント
+SYSTEM_FONT_PATTERNS = [
+    # Linux（fonts-noto-cjk など）
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/**/NotoSansCJK*.tt[cf]",
+    "/usr/share/fonts/**/NotoSansJP*.[ot]tf",
+    "/usr/share/fonts/**/ipaexg.ttf",
+    # Windows
+    "C:/Windows/Fonts/YuGothM.ttc",
+    "C:/Windows/Fonts/meiryo.ttc",
+    # macOS
+    "/System/Library/Fonts/ヒラギノ角ゴシック W3.ttc",
+]
+# フォントファイルが見つからない場合に名前で探すフォント
+JAPANESE_FONTS = [
+    "Noto Sans CJK JP",
+    "Yu Gothic",
+    "Meiryo",
+    "Hiragino Kaku Gothic ProN",
+    "sans-serif",
+]
+
+# ステータス別の棒グラフの色
+STATUS_COLORS = ["#2ecc71", "#f1c40f", "#e74c3c", "#95a5a6"]
+
+# ワーカーごとに1回だけ読み込むフォントと、使い回すグラフのテンプレート
+_font = None
+_templates = {}
+# スレッドで実行される場合に同じFigureを同時に描画しないためのロック
+_lock = threading.Lock()
+
+
+# 日本語フォントのファイルを探してパスを返す関数（見つからない場合はNone）
+def find_font_file():
+    patterns = [
+        os.path.join(FONT_DIR, f"*.{extension}") for extension in ("ttf", "otf", "ttc")
+    ] + SYSTEM_FONT_PATTERNS
+    for pattern in patterns:
+        paths = sorted(glob.glob(pattern, recursive=True))
+        if paths:
+            return paths[0]
+    return None
+
+
+# 日本語フォントを返す関数（初回だけファイルを探して読み込む）
+def get_font():
+    global _font
+    if _font is None:
+        from matplotlib.font_manager import FontProperties, fontManager
+
+        path = find_font_file()
+        if path is not None:
+            fontManager.addfont(path)
+            _font = FontProperties(fname=path)
+        else:
+            # フォントがないことは起動時にcheck_fontで表示している
+            _font = FontProperties(family=JAPANESE_FONTS)
+    return _font
+
+
+# 日本語フォントがあるかを確認し、ない場合は表示する関数（起動時に1回だけ呼び出す）
+def check_font():
+    path = find_font_file()
+    if path is None:
+        print(
+            "日本語フォントが見つかりません。グラフの日本語が表示されないため、"
+            "Public/fontsにフォントを置くか fonts-noto-cjk をインストールしてください"
+        )
+    return path
+
+
+# Figureの内容をPNGのバイト列にする関数
+def figure_to_png(figure):
+    buffer = io.BytesIO()
+    figure.savefig(buffer, format="png")
+    return buffer.getvalue()
+
+
+# メンバー統計のグラフのテンプレート
+# 軸・タイトル・レイアウトは最初に1回だけ作り、描画のたびにデータだけを差し替える
+class MemberChartTemplate:
+    def __init__(self, status_labels):
+        from matplotlib.figure import Figure
+
+        font = get_font()
+        self.status_labels = status_labels
+        self.figure = Figure(figsize=(10, 6))
+        self.pie_ax, self.bar_ax = self.figure.subplots(1, 2)
+
+        # 人間とボットの割合の円グラフ（値は仮のもの）
+        self.wedges, self.pie_labels, self.pie_values = self.pie_ax.pie(
+            [1, 1],
+            labels=["人間", "ボット"],
+            colors=["#3498db", "#e74c3c"],
+            autopct="%1.1f%%",
+            startangle=90,
+            textprops={"fontproperties": font},
+        )
+        self.pie_ax.set_title("メンバー構成", fontproperties=font)
+
+        # ステータス別の棒グラフ（高さは仮のもの）
+        self.bars = self.bar_ax.bar(
+            status_labels, [1] * len(status_labels), color=STATUS_COLORS
+        )
+        self.bar_ax.set_title("メンバーステータス", fontproperties=font)
+        for label in self.bar_ax.get_xticklabels():
+            label.set_fontproperties(font)
+            label.set_rotation(45)
+            label.set_horizontalalignment("right")
+
+        self.figure.tight_layout()
+
+    def _update_pie(self, values):
+        total = sum(values)
+        angle = 90.0
+        for wedge, label, value_text, value in zip(
+            self.wedges, self.pie_labels, self.pie_values, values
+        ):
+            share = value / total if total else 0.0
+            wedge.set_theta1(angle)
+            wedge.set_theta2(angle + 360 * share)
+            # ラベルと割合は扇形の中央の角度に置く
+            middle = math.radians(angle + 180 * share)
+            x, y = math.cos(middle), math.sin(middle)
+            label.set_position((1.1 * x, 1.1 * y))
+            label.set_horizontalalignment("left" if x > 0 else "right")
+            value_text.set_position((0.6 * x, 0.6 * y))
+            value_text.set_text(f"{share * 100:.1f}%")
+            # 0%の項目は表示しない
+            for artist in (wedge, label, value_text):
+                artist.set_visible(share > 0)
+            angle += 360 * share
+
+    def render(self, stats):
+        """データを差し替えて描画し、PNGのバイト列を返します"""
+        self._update_pie([stats["humans"], stats["bots"]])
+
+        heights = [stats["status_counts"][label] for label in self.status_labels]
+        for bar, height in zip(self.bars, heights):
+            bar.set_height(height)
+        self.bar_ax.set_ylim(0, max(max(heights), 1) * 1.05)
+
+        return figure_to_png(self.figure)
+
+
+# メンバー統計のグラフを作成する関数
+def render_member_chart(stats):
+    status_labels = tuple(stats["status_counts"].keys())
+    with _lock:
+        template = _templates.get("member")
+        if template is None or template.status_labels != status_labels:
+            template = _templates["member"] = MemberChartTemplate(status_labels)
+        return template.render(stats)
+
+
+# 統計の推移の折れ線グラフを作成する関数
+def render_trend_chart(dates, values, days):
+    from matplotlib.figure import Figure
+    import matplotlib.dates as mdates
+
+    font = get_font()
+    figure = Figure(figsize=(10, 6))
+    member_ax, server_ax = figure.subplots(2, 1, sharex=True)
+
+    # メンバー数の推移
+    member_ax.plot(dates, values["members"], color="#3498db", label="総メンバー数")
+    member_ax.plot(dates, values["online"], color="#2ecc71", label="オンライン")
+    member_ax.plot(dates, values["bots"], color="#e74c3c", label="ボット")
+    member_ax.set_title(f"メンバー数の推移（{days}日間）", fontproperties=font)
+    member_ax.legend(prop=font)
+    member_ax.grid(alpha=0.3)
+
+    # ロール数・チャンネル数の推移
+    server_ax.plot(dates, values["roles"], color="#9b59b6", label="ロール")
+    server_ax.plot(dates, values["channels"], color="#f1c40f", label="チャンネル")
+    server_ax.legend(prop=font)
+    server_ax.grid(alpha=0.3)
+
+    # 日付の表示形式（期間が短い場合は時刻も表示する）
+    tz = dates[0].tzinfo if dates else None
+    server_ax.xaxis.set_major_formatter(
+        mdates.DateFormatter("%m/%d %H:%M" if days <= 7 else "%Y/%m/%d", tz=tz)
+    )
+    for label in server_ax.get_xticklabels():
+        label.set_rotation(30)
+        label.set_horizontalalignment("right")
+
+    figure.tight_layout()
+    return figure_to_png(figure)
+
+
+# 参加時期とアカウント年齢の分布のグラフを作成する関数
+def render_analytics_chart(month_labels, month_counts, age_labels, age_counts):
+    from matplotlib.figure import Figure
+
+    font = get_font()
+    figure = Figure(figsize=(10, 6))
+    join_ax, age_ax = figure.subplots(2, 1)
+
+    # 月ごとの参加人数
+    join_ax.bar(range(len(month_counts)), month_counts, color="#3498db")
+    join_ax.set_title("月ごとの参加人数", fontproperties=font)
+    # 月が多い場合はラベルを間引く
+    step = max(1, len(month_labels) // 12)
+    join_ax.set_xticks(range(0, len(month_labels), step))
+    join_ax.set_xticklabels(month_labels[::step], rotation=30, ha="right")
+    join_ax.grid(axis="y", alpha=0.3)
+
+    # アカウント年齢の分布
+    age_ax.bar(age_labels, age_counts, color="#9b59b6")
+    age_ax.set_title("アカウント作成からの期間", fontproperties=font)
+    for label in age_ax.get_xticklabels():
+        label.set_fontproperties(font)
+    age_ax.grid(axis="y", alpha=0.3)
+
+    figure.tight_layout()
+    return figure_to_png(figure)
+
+
+# 曜日・時間帯別とチャンネル・時間帯別のメッセージ数のヒートマップを作成する関数
+def render_activity_chart(week_matrix, weekday_labels, channel_labels, channel_matrix):
+    from matplotlib.figure import Figure
+
+    font = get_font()
+    rows = 2 if channel_labels else 1
+    figure = Figure(figsize=(10, 4 + 0.3 * len(channel_labels) if rows == 2 else 4))
+    axes = figure.subplots(rows, 1, squeeze=False)[:, 0]
+
+    heatmaps = [(axes[0], week_matrix, weekday_labels, "曜日・時間帯別のメッセージ数")]
+    if channel_labels:
+        heatmaps.append(
+            (
+                axes[1],
+                channel_matrix,
+                channel_labels,
+                "チャンネル・時間帯別のメッセージ数",
+            )
+        )
+    for ax, matrix, labels, title in heatmaps:
+        image = ax.imshow(matrix, aspect="auto", cmap="YlOrRd", interpolation="nearest")
+        ax.set_title(title, fontproperties=font)
+        ax.set_yticks(range(len(labels)))
+        ax.set_yticklabels(labels, fontproperties=font)
+        ax.set_xticks(range(0, 24, 3))
+        ax.set_xticklabels(
+            [f"{hour}時" for hour in range(0, 24, 3)], fontproperties=font
+        )
+        figure.colorbar(image, ax=ax)
+
+    figure.tight_layout()
+    return figure_to_png(figure)
@@ -0,0 +1,30 @@
+import importlib
+import time
+
+# 登録するコマンドの (モジュール名, 設定関数名) の一覧（登録順）
+# 各モジュールはコマンドの定義だけを読み込み、
+# matplotlib・Pillow・multiprocessingなどの重い依存は初めて使うときに読み込む
+COMMAND_MODULES = [
+    ("fortune", "setup_fortune_command"),
+    ("schedule", "setup_schedule_command"),
+    ("seminar", "setup_seminar_command"),
+    ("seminar_reminder", "setup_seminar_reminder_command"),
+    ("help", "setup_help_command"),
+    ("unanimous_game", "setup_unanimous_game_command"),
+    ("server_stats", "setup_server_stats_command"),
+    ("about", "setup_about_commands"),
+]
+
+# モジュールごとの読み込み・登録にかかった時間（秒）
+load_times = {}
+
+
+def register_commands(tree, modules=COMMAND_MODULES):
+    """コマンドを登録し、モジュール名ごとの設定関数の戻り値を返します"""
+    results = {}
+    for module_name, setup_name in modules:
+        started = time.perf_counter()
+        module = importlib.import_module(module_name)
+        results[module_name] = getattr(module, setup_name)(tree)
+        load_times[module_name] = time.perf_counter() - started
+    return results
@@ -0,0 +1,103 @@
+import asyncio
+import datetime
+import heapq
+from collections import Counter
+from report_cache import ReportCache
+
+# 同時に集計するサーバー数
+DASHBOARD_WORKERS = 8
+# 集計結果を使い回す秒数
+DASHBOARD_TTL = 60
+# 表示するメンバー数の多いサーバーの数
+TOP_GUILDS = 10
+
+
+# 1サーバー分の集計結果をまとめたもの
+def empty_totals():
+    return Counter(
+        guilds=0,
+        members=0,
+        cached_members=0,
+        humans=0,
+        bots=0,
+        online=0,
+        channels=0,
+        roles=0,
+        chunked=0,
+        partial=0,
+        approximate=0,
+    )
+
+
+# 全サーバーの統計をまとめて集計するクラス（Botの運営者向け）
+class Dashboard:
+    def __init__(self, stats, workers=DASHBOARD_WORKERS, ttl=DASHBOARD_TTL):
+        self.stats = stats  # ServerStatsのインスタンス
+        self.workers = workers
+        self.cache = ReportCache(ttl=ttl)
+
+    async def collect_guild(self, guild, semaphore):
+        """1サーバー分の統計を集計します"""
+        # 初回はメンバー数のカウンターを少しずつ作成するため、同時に作成する数を制限する
+        async with semaphore:
+            member_stats = await self.stats.get_member_stats(guild)
+            approximate = bool(member_stats.get("approximate"))
+            channel_stats = await self.stats.get_channel_stats(guild)
+            totals = empty_totals()
+            totals.update(
+                guilds=1,
+                members=member_stats["total"] or 0,
+                cached_members=len(guild.members),
+                humans=member_stats["humans"],
+                bots=member_stats["bots"],
+                online=member_stats["online"],
+                channels=channel_stats["total_channels"],
+                roles=len(guild.roles) - 1,  # @everyoneを除く
+                chunked=int(guild.chunked),
+                # メンバー一覧が未取得の場合、内訳はキャッシュ済みのメンバーだけの値になる
+                # （推定値のサーバーは取得しないので、推定値として別に数える）
+                partial=int(not guild.chunked and not approximate),
+                approximate=int(approximate),
+            )
+            # 他のサーバーの集計やイベント処理を待たせないよう、1サーバーごとに譲る
+            await asyncio.sleep(0)
+            return guild, totals
+
+    async def build(self, guilds):
+        """全サーバーの統計を並行して集計し、結果をまとめて返します"""
+        semaphore = asyncio.Semaphore(self.workers)
+        results = await asyncio.gather(
+            *(self.collect_guild(guild, semaphore) for guild in guilds),
+            return_exceptions=True,
+        )
+
+        totals = empty_totals()
+        failed = 0
+        sizes = []
+        for result in results:
+            if isinstance(result, Exception):
+                print(f"ダッシュボードの集計に失敗しました: {result}")
+                failed += 1
+                continue
+            guild, guild_totals = result
+            totals.update(guild_totals)
+            # 内訳が正確でないサーバーは種類を添える
+            if guild_totals["approximate"]:
+                kind = "approximate"
+            elif guild_totals["partial"]:
+                kind = "partial"
+            else:
+                kind = None
+            sizes.append((guild_totals["members"], guild.name, kind))
+
+        return {
+            "totals": totals,
+            "failed": failed,
+            "top_guilds": heapq.nlargest(TOP_GUILDS, sizes),
+            "created_at": datetime.datetime.now(datetime.timezone.utc),
+        }
+
+    async def get(self, client):
+        """キャッシュした集計結果を返します（古い場合は裏で作り直します）"""
+        guilds = list(client.guilds)
+        return await self.cache.get("dashboard", lambda: self.build(guilds))
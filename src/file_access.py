@@ -0,0 +1,108 @@
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# 読み込みがこれより遅い場合はログに出す（秒）
+SLOW_READ_SECONDS = 0.5
+
+
+# パスごとの読み込み時間の統計
+class ReadStats:
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def record(self, elapsed):
+        self.count += 1
+        self.total += elapsed
+        self.last = elapsed
+        self.max = max(self.max, elapsed)
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "avg_ms": self.total / self.count * 1000 if self.count else 0.0,
+            "max_ms": self.max * 1000,
+            "last_ms": self.last * 1000,
+        }
+
+
+# イベントループを止めずにファイルを読み書きするためのクラス
+class AsyncFileAccess:
+    def __init__(self, max_workers=4, max_pending=32):
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="lyra-io"
+        )
+        # 同時に投入できるジョブ数の上限
+        self._pending = asyncio.Semaphore(max_pending)
+        self._stats = {}
+
+    async def run(self, func, *args):
+        """ブロッキングな処理をI/O用スレッドプールで実行します"""
+        async with self._pending:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, func, *args)
+
+    def _timed_read(self, path):
+        stats = self._stats.setdefault(os.path.abspath(path), ReadStats())
+        start = time.perf_counter()
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except Exception:
+            stats.errors += 1
+            raise
+        elapsed = time.perf_counter() - start
+        stats.record(elapsed)
+        if elapsed >= SLOW_READ_SECONDS:
+            print(f"ファイル読み込みが遅延しています: {path} ({elapsed * 1000:.0f}ms)")
+        return data
+
+    def _read_json(self, path):
+        return json.loads(self._timed_read(path).decode("utf-8"))
+
+    async def read_bytes(self, path):
+        """ファイルの内容をバイト列で返します"""
+        return await self.run(self._timed_read, path)
+
+    async def read_text(self, path, encoding="utf-8"):
+        """ファイルの内容を文字列で返します"""
+        return (await self.read_bytes(path)).decode(encoding)
+
+    async def read_json(self, path):
+        """JSONファイルを読み込んで返します（パースもスレッド側で行います）"""
+        return await self.run(self._read_json, path)
+
+    def _write_bytes(self, path, data):
+        # 書き込み途中の状態を読まれないよう、一時ファイル経由で置き換える
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    async def write_bytes(self, path, data):
+        """バイト列をファイルに書き込みます"""
+        await self.run(self._write_bytes, path, data)
+
+    async def write_json(self, path, obj):
+        """オブジェクトをJSONファイルに書き込みます"""
+        data = json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+        await self.write_bytes(path, data)
+
+    async def stat(self, path):
+        """os.statの結果を返します"""
+        return await self.run(os.stat, path)
+
+    def stats(self):
+        """パスごとの読み込み時間の統計を返します"""
+        return {path: stats.as_dict() for path, stats in self._stats.items()}
+
+
+# 共有のインスタンス
+file_access = AsyncFileAccess()
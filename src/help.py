@@ -16,14 +16,31 @@ def setup_help_command(tree):
         embed.add_field(
             name="/ゼミ日程",
             value="卒業研究Ⅰのゼミ日程を表示します\n"
-            "オプション: `次回`(次回の予定のみ表示), `json`(JSONデータを表示)",
+            "オプション: `次回`(次回の予定のみ表示), `json`(JSONデータを表示), `カレンダー(.ics)`(カレンダーアプリ用のファイル)\n"
+            "コース: サーバーに登録したコースの日程を表示\n"
+            "検索: `科目`, `回`, `開始日`, `終了日` で絞り込み（入力候補あり）",
+            inline=False,
+        )
+
+        embed.add_field(
+            name="/ゼミ管理",
+            value="サーバーごとのゼミ日程（コース）を管理します（サーバー管理権限が必要）\n"
+            "サブコマンド: `インポート`(JSONからコースを登録), `削除`",
+            inline=False,
+        )
+
+        embed.add_field(
+            name="/ゼミ通知",
+            value="ゼミ開始前の通知を設定します（サーバー管理権限が必要）\n"
+            "サブコマンド: `設定`(通知先と何分前かを設定), `解除`, `状態`",
             inline=False,
         )
 
         embed.add_field(
             name="/年間行事",
             value="文教大学の年間行事予定を表示します\n"
-            "オプション: `春学期`, `秋学期`(特定の学期のみ表示)",
+            "オプション: `春学期`, `秋学期`(特定の学期のみ表示)\n"
+            "画質: `最適化`(標準), `プレビュー`(縮小版), `オリジナル`(元の画像)",
             inline=False,
         )
 
@@ -43,7 +60,12 @@ def setup_help_command(tree):
         embed.add_field(
             name="/サーバー",
             value="サーバーの統計情報を表示します\n"
-            "サブコマンド: `統計`(サーバー全体の統計), `ユーザー`(特定ユーザーの情報)",
+            "サブコマンド: `統計`(サーバー全体の統計), `ユーザー`(特定ユーザーの情報), "
+            "`検索`(名前の一部・ロール・参加時期でメンバーを検索), "
+            "`活動`(チャンネル・時間帯ごとのメッセージ数), "
+            "`エクスポート`(メンバー・ロール一覧のファイル出力、サーバー管理権限が必要)\n"
+            "`統計`の表示オプションで`推移`を選ぶと、7/30/365日間の推移をグラフで表示します\n"
+            "`メンバー分析`では参加時期・アカウント作成からの期間の分布を表示します",
             inline=False,
         )
 
@@ -0,0 +1,115 @@
+import contextlib
+import glob
+import hashlib
+import importlib.util
+import io
+import os
+from file_access import file_access
+
+# Pillowは画像を変換するときに初めて読み込む（起動時間とメモリを抑えるため）
+# Pillowがない環境では元の画像をそのまま使う
+HAS_PILLOW = importlib.util.find_spec("PIL") is not None
+
+PUBLIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Public")
+# 変換後の画像の保存先
+CACHE_DIR = os.path.join(PUBLIC_DIR, ".cache")
+
+# 変換の種類ごとの設定（長辺の最大ピクセル数, JPEGの品質）
+VARIANTS = {
+    "optimized": (2048, 85),
+    "thumbnail": (320, 75),
+}
+# 元の画像を表す名前
+ORIGINAL = "original"
+
+
+# 変換後の画像のパスを返す関数
+def variant_path(source_path, variant, digest):
+    stem = os.path.splitext(os.path.basename(source_path))[0]
+    return os.path.join(CACHE_DIR, f"{stem}-{digest[:16]}-{variant}.jpg")
+
+
+# 画像を縮小・再エンコードする関数
+def encode_variant(data, variant):
+    from PIL import Image, ImageOps
+
+    max_size, quality = VARIANTS[variant]
+    with Image.open(io.BytesIO(data)) as image:
+        # スキャン画像の向きをEXIFに合わせ、JPEGで保存できる形式にする
+        image = ImageOps.exif_transpose(image).convert("RGB")
+        image.thumbnail((max_size, max_size), Image.LANCZOS)
+        buffer = io.BytesIO()
+        image.save(buffer, "JPEG", quality=quality, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+# 変換後の画像を作成してパスを返す関数（作成済みならそのまま返す）
+def build_variant(source_path, variant):
+    if variant == ORIGINAL or not HAS_PILLOW:
+        return source_path
+
+    with open(source_path, "rb") as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()
+    path = variant_path(source_path, variant, digest)
+    if os.path.exists(path):
+        return path
+
+    try:
+        encoded = encode_variant(data, variant)
+    except Exception as e:
+        print(f"画像の変換に失敗しました: {source_path} ({e})")
+        return source_path
+
+    # 再エンコードで大きくなる場合は元の画像を使う
+    if len(encoded) >= len(data):
+        return source_path
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    # 古いハッシュの変換結果は削除する
+    for old_path in glob.glob(variant_path(source_path, variant, "*" * 16)):
+        # 同時に変換した別の呼び出しが先に削除している場合がある
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(old_path)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(encoded)
+    os.replace(tmp_path, path)
+    return path
+
+
+# 変換後の画像のパスを非同期に返すクラス
+class ImagePipeline:
+    def __init__(self):
+        # (元のパス, 変換の種類) -> (元のファイルのmtime・サイズ, 変換後のパス)
+        self._paths = {}
+
+    async def get(self, source_path, variant="optimized"):
+        """変換後の画像のパスを返します（元の画像が変わった時だけ作り直します）"""
+        stat = await file_access.stat(source_path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        cached = self._paths.get((source_path, variant))
+        if cached and cached[0] == signature:
+            return cached[1]
+
+        path = await file_access.run(build_variant, source_path, variant)
+        self._paths[(source_path, variant)] = (signature, path)
+        return path
+
+
+# 共有のインスタンス
+image_pipeline = ImagePipeline()
+
+
+# ビルド時にPublicフォルダの画像を全て変換しておく
+# 使い方: python image_pipeline.py
+if __name__ == "__main__":
+    if not HAS_PILLOW:
+        print("Pillowがインストールされていません")
+    for pattern in ("*.jpg", "*.jpeg", "*.png"):
+        for source in sorted(glob.glob(os.path.join(PUBLIC_DIR, pattern))):
+            for name in VARIANTS:
+                result = build_variant(source, name)
+                before = os.path.getsize(source)
+                after = os.path.getsize(result)
+                print(f"{os.path.basename(source)} [{name}]: {before} → {after} バイト")
@@ -1,59 +1,125 @@
 import discord
+import json
 import os
 from discord import app_commands
 from dotenv import load_dotenv
 
 # 自作モジュールのインポート
-from fortune import setup_fortune_command
-from schedule import setup_schedule_command
-from seminar import setup_seminar_command
-from help import setup_help_command
 from discord_rpc import LyraPresence
-from unanimous_game import setup_unanimous_game_command
-from server_stats import setup_server_stats_command
-from about import setup_about_commands  # 追加
-
-# 環境変数の読み込み
-load_dotenv()
+from command_registry import register_commands
+from charts import check_font
 
 # Botのインテントを設定
 intents = discord.Intents.default()
 intents.members = True  # メンバー情報取得のために必要
 intents.presences = True  # プレゼンス情報取得のために必要
-client = discord.Client(intents=intents)
-tree = app_commands.CommandTree(client)
-presence = LyraPresence(client)  # RPCインスタンスを作成
-
-
-# Botが起動したときに実行される処理
-@client.event
-async def on_ready():
-    print(f"{client.user} としてログインしました")
-    # スラッシュコマンドをグローバルに同期
-    await tree.sync()
-    print("スラッシュコマンドを同期しました")
-
-    # RPCステータスを設定
-    await presence.set_simple_status("/help")
-    # または他の例:
-    # await presence.update_activity_counter(len(client.guilds))
-    # await presence.update_presence()
-    print("ステータスを更新しました")
-
-
-# 各コマンドの設定
-setup_fortune_command(tree)
-setup_schedule_command(tree)
-setup_seminar_command(tree)
-setup_help_command(tree)
-setup_unanimous_game_command(tree)
-setup_server_stats_command(tree)
-setup_about_commands(tree)  # 追加
-
-# Botを実行
-if __name__ == "__main__":
+
+
+# メンバーキャッシュの設定を読み込む関数
+def load_member_cache_settings():
+    try:
+        base_dir = os.path.dirname(os.path.abspath(__file__))
+        with open(os.path.join(base_dir, "config.json"), "r", encoding="utf-8") as f:
+            settings = json.load(f).get("member_cache", {})
+    except (FileNotFoundError, ValueError):
+        settings = {}
+    # voice: ボイスチャンネルにいるメンバー, joined: 参加・発言などで見かけたメンバー
+    flags = discord.MemberCacheFlags(
+        voice=settings.get("voice", True), joined=settings.get("joined", True)
+    )
+    # 起動時に全サーバーのメンバー一覧を取得するか（しない場合はコマンドの初回実行時に取得する）
+    return flags, settings.get("chunk_guilds_at_startup", False)
+
+
+# Botを作成し、イベントとコマンドを登録する関数
+# offloadのワーカー（spawn）はこのファイルを読み込み直すため、
+# Botの作成はモジュールの読み込み時ではなくここで行う
+def create_bot():
+    member_cache_flags, chunk_guilds_at_startup = load_member_cache_settings()
+    client = discord.Client(
+        intents=intents,
+        member_cache_flags=member_cache_flags,
+        chunk_guilds_at_startup=chunk_guilds_at_startup,
+    )
+    tree = app_commands.CommandTree(client)
+    presence = LyraPresence(client)  # RPCインスタンスを作成
+
+    # 各コマンドの設定（一覧はcommand_registry.pyにある）
+    commands = register_commands(tree)
+    seminar_reminder = commands["seminar_reminder"]
+    server_stats = commands["server_stats"]
+
+    # Botが起動したときに実行される処理
+    @client.event
+    async def on_ready():
+        print(f"{client.user} としてログインしました")
+        server_stats.on_ready()
+        server_stats.print_cache_footprint(client.guilds)
+
+        # スラッシュコマンドをグローバルに同期
+        await tree.sync()
+        print("スラッシュコマンドを同期しました")
+
+        # ゼミ通知を開始
+        await seminar_reminder.start(client)
+        # サーバー統計の推移の記録を開始
+        await server_stats.start(client)
+
+        # RPCステータスを設定
+        await presence.set_simple_status("/help")
+        # または他の例:
+        # await presence.update_activity_counter(len(client.guilds))
+        # await presence.update_presence()
+        print("ステータスを更新しました")
+
+    # サーバー統計用のイベント（メンバー数の集計を更新する）
+    @client.event
+    async def on_member_join(member):
+        server_stats.on_member_join(member)
+
+    @client.event
+    async def on_member_remove(member):
+        server_stats.on_member_remove(member)
+
+    @client.event
+    async def on_presence_update(before, after):
+        server_stats.on_presence_update(before, after)
+
+    @client.event
+    async def on_member_update(before, after):
+        server_stats.on_member_update(before, after)
+
+    @client.event
+    async def on_message(message):
+        server_stats.on_message(message)
+
+    @client.event
+    async def on_user_update(before, after):
+        server_stats.on_user_update(before, after)
+
+    @client.event
+    async def on_guild_role_delete(role):
+        server_stats.on_guild_role_delete(role)
+
+    @client.event
+    async def on_guild_remove(guild):
+        server_stats.on_guild_remove(guild)
+
+    return client
+
+
+# Botを実行する関数
+def main():
+    # 環境変数の読み込み
+    load_dotenv()
     token = os.getenv("DISCORD_TOKEN")
     if not token:
         print("エラー: DISCORD_TOKENが設定されていません")
-    else:
-        client.run(token)
+        return
+    # グラフはワーカーで描画するので、フォントの確認はここで1回だけ行う
+    check_font()
+    create_bot().run(token)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+import asyncio
+import discord
+import heapq
+from collections import Counter
+
+# 統計に表示するステータス（それ以外はオフラインとして数える）
+STATUS_LABELS = {
+    discord.Status.online: "オンライン",
+    discord.Status.idle: "退席中",
+    discord.Status.dnd: "取り込み中",
+    discord.Status.offline: "オフライン",
+}
+# プレゼンス更新をまとめて反映するまでの待ち時間（秒）
+FLUSH_DELAY = 1.0
+# カウンターの初期値を作るときに、イベントループに譲るまでに数えるメンバー数
+SEED_BATCH = 1000
+
+
+# メンバーの集計用の状態 (ボットか, ステータス, モバイルか) を返す関数
+def member_state(member):
+    status = STATUS_LABELS.get(member.status, "オフライン")
+    mobile = hasattr(member, "is_on_mobile") and member.is_on_mobile()
+    return (member.bot, status, mobile)
+
+
+# メンバーが持っているロールのID（@everyoneを除く）を返す関数
+def member_role_ids(member):
+    return {role.id for role in member.roles if not role.is_default()}
+
+
+# 1サーバー分のメンバー数のカウンター
+class GuildCounters:
+    def __init__(self, members=()):
+        self.humans = 0
+        self.bots = 0
+        self.mobile = 0
+        self.status_counts = Counter({label: 0 for label in STATUS_LABELS.values()})
+        self.role_counts = Counter()  # ロールID -> メンバー数
+        # メンバーキャッシュを1回だけ走査して初期値を作る
+        for member in members:
+            self.apply(member_state(member), 1)
+            self.apply_roles(member_role_ids(member), 1)
+
+    def apply(self, state, sign):
+        """メンバーの状態をカウンターに加算（sign=-1で減算）します"""
+        bot, status, mobile = state
+        if bot:
+            self.bots += sign
+        else:
+            self.humans += sign
+        self.status_counts[status] += sign
+        if mobile:
+            self.mobile += sign
+
+    def apply_roles(self, role_ids, sign):
+        """ロールごとのメンバー数に加算（sign=-1で減算）します"""
+        for role_id in role_ids:
+            self.role_counts[role_id] += sign
+            if self.role_counts[role_id] <= 0:
+                del self.role_counts[role_id]
+
+    def top_roles(self, n, role_ids=None):
+        """メンバー数の多いロールID上位n件を (ロールID, 人数) のリストで返します"""
+        items = self.role_counts.items()
+        if role_ids is not None:
+            # 削除済みのロールなどを除く
+            items = [item for item in items if item[0] in role_ids]
+        return heapq.nlargest(n, items, key=lambda item: item[1])
+
+
+# サーバーごとのメンバー数をイベントで更新し続けるクラス
+class MemberCounters:
+    def __init__(self, flush_delay=FLUSH_DELAY):
+        self.flush_delay = flush_delay
+        self._guilds = {}  # guild_id -> GuildCounters
+        # 初期値を作成中のサーバー guild_id -> (タスク, 作成中のカウンター, 数えたメンバーID)
+        self._seeding = {}
+        # まだ反映していないプレゼンス更新
+        # (guild_id, member_id) -> [反映済みの状態, 最新の状態]
+        self._pending = {}
+        self._flush_handle = None
+
+    def reset(self):
+        """全てのカウンターを破棄します（次回の参照時に作り直します）"""
+        self._guilds.clear()
+        self._seeding.clear()
+        self._pending.clear()
+
+    def forget_guild(self, guild_id):
+        """サーバーのカウンターを破棄します"""
+        self._guilds.pop(guild_id, None)
+        self._seeding.pop(guild_id, None)
+        for key in [key for key in self._pending if key[0] == guild_id]:
+            del self._pending[key]
+
+    def forget_role(self, role):
+        """削除されたロールの人数を破棄します"""
+        counters = self._counters(role.guild.id)
+        if counters is not None:
+            counters.role_counts.pop(role.id, None)
+
+    def _schedule_flush(self):
+        if self._flush_handle is None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                return
+            self._flush_handle = loop.call_later(self.flush_delay, self.flush)
+
+    def flush(self, guild_id=None):
+        """まとめておいたプレゼンス更新をカウンターに反映します"""
+        if guild_id is None:
+            self._flush_handle = None
+            keys = list(self._pending)
+        else:
+            keys = [key for key in self._pending if key[0] == guild_id]
+
+        for key in keys:
+            before, after = self._pending.pop(key)
+            counters = self._counters(key[0])
+            if counters is not None and before != after:
+                counters.apply(before, -1)
+                counters.apply(after, 1)
+
+    def _counters(self, guild_id):
+        """作成済み・作成中のサーバーのカウンターを返します"""
+        counters = self._guilds.get(guild_id)
+        if counters is None and guild_id in self._seeding:
+            counters = self._seeding[guild_id][1]
+        return counters
+
+    def _target(self, guild_id, member_id):
+        """メンバーの変更を反映するカウンターを返します（まだ数えていないメンバーはNone）"""
+        counters = self._guilds.get(guild_id)
+        if counters is not None:
+            return counters
+        seeding = self._seeding.get(guild_id)
+        # まだ数えていないメンバーは、数えるときに最新の状態が入るので反映しない
+        if seeding is not None and member_id in seeding[2]:
+            return seeding[1]
+        return None
+
+    def on_member_join(self, member):
+        seeding = self._seeding.get(member.guild.id)
+        if seeding is not None:
+            # 作成中に参加したメンバーは走査の対象に入っていないので、ここで数える
+            seeding[2].add(member.id)
+        counters = self._target(member.guild.id, member.id)
+        if counters is not None:
+            counters.apply(member_state(member), 1)
+            counters.apply_roles(member_role_ids(member), 1)
+
+    def on_member_remove(self, member):
+        counters = self._target(member.guild.id, member.id)
+        seeding = self._seeding.get(member.guild.id)
+        if seeding is not None:
+            # まだ数えていない場合も、退出したメンバーは数えないようにする
+            seeding[2].add(member.id)
+        if counters is None:
+            return
+        # 未反映の更新があれば、カウンターに入っている方の状態を取り消す
+        pending = self._pending.pop((member.guild.id, member.id), None)
+        counters.apply(pending[0] if pending else member_state(member), -1)
+        counters.apply_roles(member_role_ids(member), -1)
+
+    def on_member_update(self, before, after):
+        counters = self._target(after.guild.id, after.id)
+        if counters is None:
+            return
+        # 付け外しされたロールの差分だけを反映する
+        before_roles = member_role_ids(before)
+        after_roles = member_role_ids(after)
+        if before_roles != after_roles:
+            counters.apply_roles(before_roles - after_roles, -1)
+            counters.apply_roles(after_roles - before_roles, 1)
+
+    def on_presence_update(self, before, after):
+        if self._target(after.guild.id, after.id) is None:
+            return
+        key = (after.guild.id, after.id)
+        pending = self._pending.get(key)
+        if pending is None:
+            self._pending[key] = [member_state(before), member_state(after)]
+            self._schedule_flush()
+        else:
+            # 同じメンバーの連続した更新は最新の状態だけを残す
+            pending[1] = member_state(after)
+
+    async def load(self, guild):
+        """サーバーのカウンターを返します（初回はメンバーキャッシュから作成します）"""
+        counters = self._guilds.get(guild.id)
+        if counters is not None:
+            self.flush(guild.id)
+            return counters
+        seeding = self._seeding.get(guild.id)
+        if seeding is None:
+            counters, counted = GuildCounters(), set()
+            task = asyncio.create_task(self._seed(guild, counters, counted))
+            seeding = self._seeding[guild.id] = (task, counters, counted)
+        return await asyncio.shield(seeding[0])
+
+    async def _seed(self, guild, counters, counted):
+        # 大きなサーバーでは時間がかかるため、少しずつ数えてイベントループに譲る
+        members = list(guild.members)
+        for start in range(0, len(members), SEED_BATCH):
+            for member in members[start : start + SEED_BATCH]:
+                if member.id not in counted:
+                    counted.add(member.id)
+                    counters.apply(member_state(member), 1)
+                    counters.apply_roles(member_role_ids(member), 1)
+            await asyncio.sleep(0)
+            if self._counters(guild.id) is not counters:
+                break
+        if self._counters(guild.id) is not counters:
+            # 作成中に破棄された場合は登録しない
+            return counters
+        del self._seeding[guild.id]
+        self._guilds[guild.id] = counters
+        self.flush(guild.id)
+        return counters
@@ -0,0 +1,302 @@
+import asyncio
+import unicodedata
+from member_counters import member_role_ids
+
+# 部分一致の検索に使う文字の数（日本語は単語の区切りがないためn-gramで探す）
+NGRAM_SIZE = 2
+# 検索結果の最大件数（オートコンプリートの候補は25件まで）
+SEARCH_LIMIT = 25
+# トライ木のノードでメンバーIDを入れておくキー（1文字のキーと重ならない）
+TERMINAL = ""
+# カタカナをひらがなにする変換表
+KATAKANA_TO_HIRAGANA = {code: code - 0x60 for code in range(0x30A1, 0x30F7)}
+
+
+# 検索用に文字列をそろえる関数（全角・半角、大文字・小文字、カタカナ・ひらがなを区別しない）
+def normalize(text):
+    text = unicodedata.normalize("NFKC", text or "").casefold()
+    return text.translate(KATAKANA_TO_HIRAGANA).strip()
+
+
+# 文字列のn-gramの集合を返す関数
+def ngrams(text, size=NGRAM_SIZE):
+    return {text[i : i + size] for i in range(len(text) - size + 1)}
+
+
+# メンバーの検索対象の文字列（表示名とユーザー名）を返す関数
+def member_keys(member):
+    keys = {normalize(member.display_name), normalize(member.name)}
+    keys.discard("")
+    return tuple(sorted(keys))
+
+
+# 索引に登録したメンバーの情報
+class SearchEntry:
+    __slots__ = ("keys", "role_ids", "joined_at")
+
+    def __init__(self, member):
+        self.keys = member_keys(member)
+        self.role_ids = frozenset(member_role_ids(member))
+        self.joined_at = member.joined_at.timestamp() if member.joined_at else None
+
+    def matches(self, role_id=None, joined_after=None):
+        """ロールと参加時期の条件に合うかを返します"""
+        if role_id is not None and role_id not in self.role_ids:
+            return False
+        if joined_after is not None:
+            return self.joined_at is not None and self.joined_at >= joined_after
+        return True
+
+
+# 1サーバー分のメンバーの検索用の索引
+# 前方一致はトライ木、部分一致はn-gramの転置索引で探す
+class GuildSearchIndex:
+    def __init__(self, members):
+        self.entries = {}  # メンバーID -> SearchEntry
+        self.trie = {}  # 1文字ずつのノード（TERMINALにメンバーIDの集合）
+        self.grams = {}  # n-gram -> メンバーIDの集合
+        self.role_members = {}  # ロールID -> メンバーIDの集合
+        # メンバーキャッシュを1回だけ走査して索引を作る
+        for member in members:
+            self.add(member)
+
+    def add(self, member):
+        """メンバーを索引に登録します（登録済みの場合は登録し直します）"""
+        if member.id in self.entries:
+            self.remove(member.id)
+        entry = self.entries[member.id] = SearchEntry(member)
+        for key in entry.keys:
+            node = self.trie
+            for char in key:
+                node = node.setdefault(char, {})
+            node.setdefault(TERMINAL, set()).add(member.id)
+            for gram in ngrams(key):
+                self.grams.setdefault(gram, set()).add(member.id)
+        for role_id in entry.role_ids:
+            self.role_members.setdefault(role_id, set()).add(member.id)
+
+    def remove(self, member_id):
+        """メンバーを索引から除きます"""
+        entry = self.entries.pop(member_id, None)
+        if entry is None:
+            return
+        for key in entry.keys:
+            self._remove_key(key, member_id)
+            for gram in ngrams(key):
+                _discard(self.grams, gram, member_id)
+        for role_id in entry.role_ids:
+            _discard(self.role_members, role_id, member_id)
+
+    def _remove_key(self, key, member_id):
+        # 通ったノードを覚えておき、空になったノードを末尾から削除する
+        path = [self.trie]
+        for char in key:
+            node = path[-1].get(char)
+            if node is None:
+                return
+            path.append(node)
+        _discard(path[-1], TERMINAL, member_id)
+        for depth in range(len(key), 0, -1):
+            if path[depth]:
+                break
+            del path[depth - 1][key[depth - 1]]
+
+    def update(self, member):
+        """名前やロールが変わった場合だけ登録し直します"""
+        entry = self.entries.get(member.id)
+        if (
+            entry is None
+            or entry.keys != member_keys(member)
+            or entry.role_ids != member_role_ids(member)
+        ):
+            self.add(member)
+
+    def forget_role(self, role_id):
+        """削除されたロールを索引から除きます"""
+        for member_id in self.role_members.pop(role_id, ()):
+            entry = self.entries.get(member_id)
+            if entry is not None:
+                entry.role_ids = entry.role_ids - {role_id}
+
+    def _prefix_matches(self, query):
+        """名前がqueryで始まるメンバーIDを短い名前から順に返すジェネレーター"""
+        node = self.trie
+        for char in query:
+            node = node.get(char)
+            if node is None:
+                return
+        # 幅優先でたどると短い名前（より近い候補）が先に見つかる
+        level = [node]
+        while level:
+            next_level = []
+            for node in level:
+                for char, child in node.items():
+                    if char == TERMINAL:
+                        yield from child
+                    else:
+                        next_level.append(child)
+            level = next_level
+
+    def _substring_matches(self, query):
+        """名前にqueryを含むメンバーIDを返します"""
+        grams = ngrams(query)
+        if not grams:
+            # n-gramより短い検索語は索引を使えないので、全員の名前を順に調べる
+            return {
+                member_id
+                for member_id, entry in self.entries.items()
+                if any(query in key for key in entry.keys)
+            }
+        # 候補の少ないn-gramから絞り込む
+        postings = sorted((self.grams.get(gram, set()) for gram in grams), key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates &= posting
+            if not candidates:
+                return candidates
+        # n-gramが全て含まれていても並びが違う場合があるので確かめる
+        return {
+            member_id
+            for member_id in candidates
+            if any(query in key for key in self.entries[member_id].keys)
+        }
+
+    def search(self, query="", role_id=None, joined_after=None, limit=SEARCH_LIMIT):
+        """条件に合うメンバーIDを、前方一致・部分一致の順に最大limit件返します"""
+        query = normalize(query)
+
+        def accept(member_id):
+            return self.entries[member_id].matches(role_id, joined_after)
+
+        if not query:
+            # 名前の指定がない場合はロールの所属者（なければ全員）から探す
+            pool = (
+                self.role_members.get(role_id, ())
+                if role_id is not None
+                else self.entries
+            )
+            results = []
+            for member_id in pool:
+                if accept(member_id):
+                    results.append(member_id)
+                    if len(results) >= limit:
+                        break
+            return results
+
+        results = []
+        seen = set()
+        for member_id in self._prefix_matches(query):
+            if member_id not in seen and accept(member_id):
+                seen.add(member_id)
+                results.append(member_id)
+                if len(results) >= limit:
+                    return results
+
+        # 前方一致で足りない分を部分一致で補う
+        rest = [
+            member_id
+            for member_id in self._substring_matches(query) - seen
+            if accept(member_id)
+        ]
+        rest.sort(key=lambda member_id: min(map(len, self.entries[member_id].keys)))
+        return results + rest[: limit - len(results)]
+
+    def __len__(self):
+        return len(self.entries)
+
+
+# 集合の辞書から値を除き、空になった集合を削除する関数
+def _discard(index, key, value):
+    values = index.get(key)
+    if values is not None:
+        values.discard(value)
+        if not values:
+            del index[key]
+
+
+# サーバーごとのメンバー検索の索引をイベントで更新し続けるクラス
+class MemberSearch:
+    def __init__(self):
+        self._guilds = {}  # guild_id -> GuildSearchIndex
+        # 索引を作成中のサーバー guild_id -> (タスク, 作成中に変更があったメンバーID)
+        self._building = {}
+
+    def reset(self):
+        self._guilds.clear()
+        self._building.clear()
+
+    def forget_guild(self, guild_id):
+        self._guilds.pop(guild_id, None)
+        self._building.pop(guild_id, None)
+
+    def get(self, guild):
+        """作成済みのサーバーの索引を返します（作成中・未作成の場合はNone）"""
+        return self._guilds.get(guild.id)
+
+    async def load(self, guild):
+        """サーバーの索引を返します（初回はメンバーキャッシュから作成します）"""
+        index = self._guilds.get(guild.id)
+        if index is not None:
+            return index
+        building = self._building.get(guild.id)
+        if building is None:
+            task = asyncio.create_task(self._build(guild))
+            building = self._building[guild.id] = (task, set())
+        return await asyncio.shield(building[0])
+
+    async def _build(self, guild):
+        building = self._building.get(guild.id)
+        # 大きなサーバーでは数秒かかるため、イベントループの外で作成する
+        index = await asyncio.to_thread(GuildSearchIndex, list(guild.members))
+        if self._building.get(guild.id) is not building:
+            # 作成中に破棄された場合は登録しない
+            return index
+        del self._building[guild.id]
+        # 作成中に届いたイベントの分を反映する
+        for member_id in building[1]:
+            member = guild.get_member(member_id)
+            if member is None:
+                index.remove(member_id)
+            else:
+                index.update(member)
+        self._guilds[guild.id] = index
+        return index
+
+    def _touch(self, guild_id, member_id):
+        """索引を作成中ならメンバーを後で反映する対象にし、作成済みなら索引を返します"""
+        building = self._building.get(guild_id)
+        if building is not None:
+            building[1].add(member_id)
+        return self._guilds.get(guild_id)
+
+    def on_member_join(self, member):
+        index = self._touch(member.guild.id, member.id)
+        if index is not None:
+            index.add(member)
+
+    def on_member_remove(self, member):
+        index = self._touch(member.guild.id, member.id)
+        if index is not None:
+            index.remove(member.id)
+
+    def on_member_update(self, before, after):
+        index = self._touch(after.guild.id, after.id)
+        if index is not None:
+            index.update(after)
+
+    def on_user_update(self, before, after):
+        # ユーザー名の変更は全ての共通サーバーに反映する
+        for guild in after.mutual_guilds:
+            index = self._touch(guild.id, after.id)
+            member = guild.get_member(after.id)
+            if index is not None and member is not None:
+                index.update(member)
+
+    def forget_role(self, role):
+        index = self._guilds.get(role.guild.id)
+        if index is not None:
+            index.forget_role(role.id)
+        building = self._building.get(role.guild.id)
+        if building is not None:
+            # 作成中の索引には削除前のロールが入っている場合があるので作り直す
+            self.forget_guild(role.guild.id)
@@ -0,0 +1,104 @@
+import time
+from member_counters import member_role_ids
+
+# アカウント年齢の区切り（日数）と表示名
+ACCOUNT_AGE_BINS = [0, 30, 90, 365, 365 * 3, 365 * 5]
+ACCOUNT_AGE_LABELS = [
+    "30日未満",
+    "90日未満",
+    "1年未満",
+    "3年未満",
+    "5年未満",
+    "5年以上",
+]
+# 日時が不明な場合の値
+MISSING = -1
+
+
+# メンバーキャッシュを列ごとのNumPy配列にしたもの
+# 集計は配列の演算で行い、メンバーを1人ずつ調べるループは作成時の1回だけにする
+class MemberSnapshot:
+    def __init__(self, columns, role_ids, taken_at):
+        self.bot = columns["bot"]  # ボットか (bool)
+        self.joined_at = columns["joined_at"]  # 参加日時のUNIX秒 (int64)
+        self.created_at = columns["created_at"]  # アカウント作成日時のUNIX秒 (int64)
+        # ロールのビット列 (メンバー数 × ロール数/8 のuint8)
+        self.roles = columns["roles"]
+        self.role_ids = role_ids  # ビットの位置 -> ロールID
+        self.taken_at = taken_at
+
+    @classmethod
+    def build(cls, members, taken_at=None):
+        """メンバーのリストからスナップショットを作成します"""
+        import numpy as np
+
+        count = len(members)
+        bot = np.empty(count, dtype=bool)
+        joined_at = np.full(count, MISSING, dtype=np.int64)
+        created_at = np.full(count, MISSING, dtype=np.int64)
+        role_index = {}  # ロールID -> ビットの位置
+        role_rows, role_columns = [], []
+
+        for row, member in enumerate(members):
+            bot[row] = member.bot
+            if member.joined_at is not None:
+                joined_at[row] = int(member.joined_at.timestamp())
+            created_at[row] = int(member.created_at.timestamp())
+            for role_id in member_role_ids(member):
+                role_rows.append(row)
+                role_columns.append(role_index.setdefault(role_id, len(role_index)))
+
+        # ロールの所属をビット列にまとめる
+        matrix = np.zeros((count, len(role_index)), dtype=bool)
+        matrix[role_rows, role_columns] = True
+        columns = {
+            "bot": bot,
+            "joined_at": joined_at,
+            "created_at": created_at,
+            "roles": np.packbits(matrix, axis=1),
+        }
+        role_ids = [None] * len(role_index)
+        for role_id, column in role_index.items():
+            role_ids[column] = role_id
+        return cls(columns, role_ids, time.time() if taken_at is None else taken_at)
+
+    def __len__(self):
+        return len(self.bot)
+
+    def without_roles(self, humans_only=True):
+        """ロールを1つも持っていない人数を返します"""
+        mask = ~self.roles.any(axis=1)
+        if humans_only:
+            mask &= ~self.bot
+        return int(mask.sum())
+
+    def join_histogram(self):
+        """月ごとの参加人数を (年月のリスト, 人数のリスト) で返します"""
+        import numpy as np
+
+        joined = self.joined_at[self.joined_at != MISSING]
+        if not len(joined):
+            return [], []
+        months = joined.astype("datetime64[s]").astype("datetime64[M]")
+        first, last = months.min(), months.max()
+        # 参加者がいない月も0人として並べる
+        index = (months - first).astype(np.int64)
+        counts = np.bincount(index, minlength=int((last - first).astype(np.int64)) + 1)
+        labels = np.arange(first, last + 1).astype(str)
+        return [str(label) for label in labels], counts.tolist()
+
+    def account_age_distribution(self):
+        """アカウント年齢の区分ごとの人数を (区分のリスト, 人数のリスト) で返します"""
+        import numpy as np
+
+        ages = (self.taken_at - self.created_at) / 86400
+        edges = ACCOUNT_AGE_BINS + [np.inf]
+        counts, _ = np.histogram(ages, bins=edges)
+        return list(ACCOUNT_AGE_LABELS), counts.tolist()
+
+    def joined_within(self, days):
+        """直近days日以内に参加した人数と割合を返します"""
+        if not len(self):
+            return 0, 0.0
+        recent = int((self.joined_at >= self.taken_at - days * 86400).sum())
+        return recent, recent / len(self)
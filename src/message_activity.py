@@ -0,0 +1,189 @@
+import heapq
+import time
+from array import array
+from activity_tracker import CountMinSketch
+
+# 記録する時間数（直近7日間を1時間ごとに保持する）
+HOURS_KEPT = 24 * 7
+# 記録するチャンネルの最大数（超えた場合は直近7日間にメッセージのないチャンネルと入れ替える）
+MAX_CHANNELS = 50
+# 上位候補として保持する投稿者の数
+MAX_AUTHORS = 32
+# 日本時間の時差（時間）
+JST_OFFSET = 9
+# 曜日の表示名（月曜日から）
+WEEKDAY_LABELS = ["月", "火", "水", "木", "金", "土", "日"]
+
+
+# 現在の時刻を1970年からの経過時間（時間単位）で返す関数
+def current_hour():
+    return int(time.time() // 3600)
+
+
+# 経過時間から日本時間の (曜日, 時) を返す関数（1970/1/1は木曜日）
+def weekday_hour(hour):
+    local = hour + JST_OFFSET
+    return (local // 24 + 3) % 7, local % 24
+
+
+# 1時間ごとのメッセージ数を一定の時間数だけ保持するリングバッファ
+# 古い時間の枠は次に使うときに0に戻すので、メモリ量は時間数で固定される
+class HourlyRing:
+    def __init__(self, size=HOURS_KEPT):
+        self.size = size
+        self.counts = array("l", [0]) * size
+        self.hours = array("q", [-1]) * size  # 枠ごとの記録した時間
+
+    def add(self, hour, count=1):
+        slot = hour % self.size
+        if self.hours[slot] != hour:
+            self.hours[slot] = hour
+            self.counts[slot] = 0
+        self.counts[slot] += count
+
+    def items(self, now):
+        """直近の (時間, メッセージ数) を古い順に返すジェネレーター"""
+        for hour in range(now - self.size + 1, now + 1):
+            slot = hour % self.size
+            yield hour, self.counts[slot] if self.hours[slot] == hour else 0
+
+    def total(self, now):
+        return sum(count for _, count in self.items(now))
+
+
+# 1サーバー分のメッセージ数の集計
+class GuildMessageActivity:
+    def __init__(self, max_channels=MAX_CHANNELS, max_authors=MAX_AUTHORS):
+        self.max_channels = max_channels
+        self.max_authors = max_authors
+        self.total = HourlyRing()
+        self.channels = {}  # チャンネルID -> HourlyRing
+        self._evict_checked = None  # チャンネルの入れ替えを最後に確認した時間
+        # 投稿者ごとの数は直近の期間と1つ前の期間のスケッチで数え、期間ごとに入れ替える
+        self.authors = CountMinSketch()
+        self.previous_authors = CountMinSketch()
+        self.author_period = current_hour() // HOURS_KEPT
+        self.author_candidates = {}  # 上位候補 投稿者ID -> 推定メッセージ数
+
+    def record(self, channel_id, author_id, hour):
+        """メッセージ1件を記録します"""
+        self.total.add(hour)
+        ring = self.channels.get(channel_id)
+        if ring is None:
+            ring = self._add_channel(channel_id, hour)
+        if ring is not None:
+            ring.add(hour)
+
+        self._rotate_authors(hour)
+        estimate = self._estimate_author(author_id, add=True)
+        if author_id in self.author_candidates:
+            self.author_candidates[author_id] = estimate
+        elif len(self.author_candidates) < self.max_authors:
+            self.author_candidates[author_id] = estimate
+        else:
+            # 最も少ない候補より多ければ入れ替える
+            weakest = min(self.author_candidates, key=self.author_candidates.get)
+            if estimate > self.author_candidates[weakest]:
+                del self.author_candidates[weakest]
+                self.author_candidates[author_id] = estimate
+
+    def _add_channel(self, channel_id, hour):
+        if len(self.channels) >= self.max_channels:
+            # 全チャンネルを調べるのは重いので、入れ替えられるかの確認は1時間に1回にする
+            if self._evict_checked is not None and hour <= self._evict_checked:
+                return None
+            self._evict_checked = hour
+            quietest = min(
+                self.channels, key=lambda key: self.channels[key].total(hour)
+            )
+            # 記録中のチャンネルが全て新しいチャンネルより活発な場合は記録しない
+            if self.channels[quietest].total(hour) > 0:
+                return None
+            del self.channels[quietest]
+        ring = self.channels[channel_id] = HourlyRing()
+        return ring
+
+    def _rotate_authors(self, hour):
+        period = hour // HOURS_KEPT
+        if period <= self.author_period:
+            return
+        # 1つ前の期間より古い分は捨てる
+        self.previous_authors = (
+            self.authors if period == self.author_period + 1 else CountMinSketch()
+        )
+        self.authors = CountMinSketch()
+        self.author_period = period
+        for author_id in self.author_candidates:
+            self.author_candidates[author_id] = self._estimate_author(author_id)
+
+    def _estimate_author(self, author_id, add=False):
+        """投稿者の推定メッセージ数を返します（add=Trueで1件加算します）"""
+        if add:
+            current = self.authors.add(author_id)
+        else:
+            current = self.authors.estimate(author_id)
+        return current + self.previous_authors.estimate(author_id)
+
+    def heatmap(self, now):
+        """曜日 × 時間帯（日本時間）のメッセージ数を7行24列のリストで返します"""
+        matrix = [[0] * 24 for _ in range(7)]
+        for hour, count in self.total.items(now):
+            weekday, hour_of_day = weekday_hour(hour)
+            matrix[weekday][hour_of_day] += count
+        return matrix
+
+    def top_channels(self, now, n):
+        """メッセージの多いチャンネル上位n件を (チャンネルID, 件数, 時間帯別の件数) で返します"""
+        totals = {
+            channel_id: ring.total(now) for channel_id, ring in self.channels.items()
+        }
+        top = heapq.nlargest(
+            n,
+            ((channel_id, total) for channel_id, total in totals.items() if total > 0),
+            key=lambda item: item[1],
+        )
+        results = []
+        for channel_id, total in top:
+            hours = [0] * 24
+            for hour, count in self.channels[channel_id].items(now):
+                hours[weekday_hour(hour)[1]] += count
+            results.append((channel_id, total, hours))
+        return results
+
+    def top_authors(self, n):
+        """メッセージの多い投稿者上位n件を (投稿者ID, 推定件数) のリストで返します"""
+        self._rotate_authors(current_hour())
+        # 候補の件数は他の投稿者と衝突して変わり得るので、ここで推定し直す
+        for author_id in self.author_candidates:
+            self.author_candidates[author_id] = self._estimate_author(author_id)
+        return heapq.nlargest(
+            n,
+            (item for item in self.author_candidates.items() if item[1] > 0),
+            key=lambda item: item[1],
+        )
+
+
+# サーバーごとのメッセージ数をon_messageで集計し続けるクラス
+# メッセージの本文は読まず、チャンネル・投稿者・時刻だけを数える
+class MessageActivity:
+    def __init__(self):
+        self._guilds = {}  # guild_id -> GuildMessageActivity
+
+    def forget_guild(self, guild_id):
+        self._guilds.pop(guild_id, None)
+
+    def get(self, guild_id):
+        """サーバーの集計を返します（まだメッセージがない場合はNone）"""
+        return self._guilds.get(guild_id)
+
+    def on_message(self, message):
+        if message.guild is None or message.author.bot or message.webhook_id:
+            return
+        activity = self._guilds.get(message.guild.id)
+        if activity is None:
+            activity = self._guilds[message.guild.id] = GuildMessageActivity()
+        # スレッドのメッセージは親チャンネルの分として数える
+        channel = message.channel
+        channel_id = getattr(channel, "parent_id", None) or channel.id
+        hour = int(message.created_at.timestamp() // 3600)
+        activity.record(channel_id, message.author.id, hour)
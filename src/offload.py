@@ -0,0 +1,110 @@
+import asyncio
+import os
+from concurrent.futures import BrokenExecutor, ThreadPoolExecutor
+
+# 同時に実行するワーカー数
+MAX_WORKERS = max(1, min(2, os.cpu_count() or 1))
+# 実行中・待機中を合わせたジョブ数の上限
+MAX_PENDING = 8
+# 1ジョブあたりの制限時間（秒）
+JOB_TIMEOUT = 30.0
+
+
+# 待機中のジョブが多すぎる場合の例外
+class OffloadQueueFull(Exception):
+    pass
+
+
+# CPUを使う重い処理をイベントループの外で実行するクラス
+# プロセスプールを使い、使えない環境ではスレッドプールに切り替える
+class OffloadExecutor:
+    def __init__(
+        self,
+        max_workers=MAX_WORKERS,
+        max_pending=MAX_PENDING,
+        timeout=JOB_TIMEOUT,
+        use_processes=True,
+    ):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.use_processes = use_processes
+        self._executor = None
+        self._inflight = 0
+
+    def _create_executor(self):
+        if self.use_processes:
+            try:
+                # multiprocessingは最初のジョブを実行するときに読み込む
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+
+                # スレッドが動いている状態でforkしないようspawnで起動する
+                return ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            except (OSError, NotImplementedError, ImportError) as e:
+                print(f"プロセスプールを使用できないためスレッドで実行します: {e}")
+                self.use_processes = False
+        return ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="lyra-offload"
+        )
+
+    def _fallback_to_threads(self, error):
+        print(f"プロセスプールが停止したためスレッドで実行します: {error}")
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        self.use_processes = False
+        self._executor = self._create_executor()
+
+    async def run(self, func, *args, timeout=None):
+        """funcをワーカーで実行して結果を返します（funcと引数はpickle可能であること）"""
+        if self._inflight >= self.max_pending:
+            raise OffloadQueueFull(
+                "処理が混み合っています。しばらくしてから再度お試しください"
+            )
+
+        if self._executor is None:
+            self._executor = self._create_executor()
+
+        try:
+            # 制限時間を過ぎた場合は結果を待たずに諦める（ワーカー側の処理は最後まで続く）
+            return await asyncio.wait_for(
+                self._submit(func, args), timeout or self.timeout
+            )
+        except BrokenExecutor as e:  # プロセスプールが異常終了した場合
+            self._fallback_to_threads(e)
+            return await asyncio.wait_for(
+                self._submit(func, args), timeout or self.timeout
+            )
+
+    def _submit(self, func, args):
+        loop = asyncio.get_running_loop()
+        job = self._executor.submit(func, *args)
+        self._inflight += 1
+        # 待つのを諦めてもワーカー側の処理は続くので、処理が終わった時点で数を戻す
+        job.add_done_callback(lambda _: self._release(loop))
+        return asyncio.wrap_future(job, loop=loop)
+
+    def _release(self, loop):
+        # ワーカー側のスレッドから呼ばれるので、数の更新はイベントループで行う
+        try:
+            loop.call_soon_threadsafe(self._job_done)
+        except RuntimeError:  # イベントループが終了している場合
+            pass
+
+    def _job_done(self):
+        self._inflight -= 1
+
+    def stats(self):
+        """実行方式と実行中のジョブ数を返します"""
+        return {
+            "mode": "process" if self.use_processes else "thread",
+            "inflight": self._inflight,
+            "max_pending": self.max_pending,
+        }
+
+
+# 共有のインスタンス
+offload = OffloadExecutor()
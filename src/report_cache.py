@@ -0,0 +1,84 @@
+import asyncio
+import time
+
+# 有効期間（秒）
+DEFAULT_TTL = 30
+# 有効期間を過ぎてもこの秒数までは古い結果を返しつつ裏で更新する
+DEFAULT_MAX_STALE = 600
+
+
+# 古い結果を返しながら裏で作り直すキャッシュ（stale-while-revalidate）
+class ReportCache:
+    def __init__(self, ttl=DEFAULT_TTL, max_stale=DEFAULT_MAX_STALE):
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self._entries = {}  # key -> (作成時刻, 値)
+        self._refreshing = {}  # key -> 作成中のタスク
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    def _start_refresh(self, key, compute, background=False):
+        task = self._refreshing.get(key)
+        if task is None:
+            task = asyncio.create_task(self._refresh(key, compute))
+            self._refreshing[key] = task
+            if background:
+                # 誰も結果を待たないので、失敗した場合はここでログを出す
+                task.add_done_callback(self._log_refresh_error)
+        return task
+
+    async def _refresh(self, key, compute):
+        try:
+            value = await compute()
+            self._entries[key] = (time.monotonic(), value)
+            return value
+        finally:
+            self._refreshing.pop(key, None)
+
+    def _log_refresh_error(self, task):
+        if not task.cancelled() and task.exception() is not None:
+            print(f"キャッシュの更新に失敗しました: {task.exception()}")
+
+    async def get(self, key, compute):
+        """キャッシュした値を返します（無い場合や古すぎる場合はcomputeで作成します）"""
+        entry = self._entries.get(key)
+        age = time.monotonic() - entry[0] if entry else None
+
+        if entry is not None and age < self.ttl:
+            self.hits += 1
+            return entry[1]
+
+        if entry is not None and age < self.ttl + self.max_stale:
+            # 古い結果をすぐに返し、裏で作り直す
+            self.stale_hits += 1
+            self._start_refresh(key, compute, background=True)
+            return entry[1]
+
+        # 同じキーの作成が同時に走らないよう、作成中のタスクを共有する
+        self.misses += 1
+        return await asyncio.shield(self._start_refresh(key, compute))
+
+    def age(self, key):
+        """キャッシュした値の経過秒数を返します（無い場合はNone）"""
+        entry = self._entries.get(key)
+        return time.monotonic() - entry[0] if entry else None
+
+    def invalidate(self, match=None):
+        """キャッシュを破棄します（matchを指定した場合は一致するキーだけ）"""
+        if match is None:
+            self._entries.clear()
+        else:
+            for key in [key for key in self._entries if match(key)]:
+                del self._entries[key]
+
+    def stats(self):
+        """ヒット・ミスの回数を返します"""
+        total = self.hits + self.stale_hits + self.misses
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.stale_hits) / total if total else 0.0,
+            "entries": len(self._entries),
+        }
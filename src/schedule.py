@@ -1,6 +1,60 @@
 import discord
 import os
 from discord import app_commands
+from asset_cache import asset_cache
+from image_pipeline import image_pipeline
+
+# 学期ごとの画像（キャッシュ上の名前, Publicフォルダ内のファイル名）
+SEMESTER_IMAGES = {
+    "春学期": ("spring", "春.jpg"),
+    "秋学期": ("fall", "秋.jpg"),
+}
+
+
+# 学期の画像を送信する関数
+# 一度アップロードした画像はCDNのURLを記録し、以降はEmbedでURLを参照する
+async def send_semester_images(interaction, title, semesters, variant="optimized"):
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    public_dir = os.path.join(base_dir, "Public")
+
+    embeds = []
+    files = []
+    uploaded = []
+    for semester in semesters:
+        name, source = SEMESTER_IMAGES[semester]
+        # 画質に応じて最適化済み・サムネイル・元の画像のいずれかを使う
+        path = await image_pipeline.get(os.path.join(public_dir, source), variant)
+        asset = await asset_cache.get(f"{name}-{variant}", path, f"{name}.jpg")
+        url = await asset_cache.cached_url(asset)
+        if url is None:
+            # 未アップロード（または画像が変わった）場合だけ添付する
+            files.append(asset.to_file())
+            uploaded.append(asset)
+            url = f"attachment://{asset.filename}"
+
+        embed = discord.Embed(title=semester, color=discord.Color.blue())
+        embed.set_image(url=url)
+        embeds.append(embed)
+
+    await interaction.response.send_message(
+        title, embeds=embeds, files=files, silent=True
+    )
+
+    if uploaded:
+        # 送信は済んでいるので、URLを記録できなくても次回また添付するだけにする
+        try:
+            message = await interaction.original_response()
+            await asset_cache.remember(message, uploaded)
+        except Exception as e:
+            print(f"画像のURLの記録に失敗しました: {e}")
+
+
+# エラーを通知する関数（画像の送信後に失敗した場合は送り直さない）
+async def send_error(interaction, message):
+    if interaction.response.is_done():
+        print(message)
+        return
+    await interaction.response.send_message(message, ephemeral=True)
 
 
 # 年間行事コマンドを設定する関数
@@ -11,55 +65,45 @@ def setup_schedule_command(tree):
         学期=[
             app_commands.Choice(name="春学期", value="春学期"),
             app_commands.Choice(name="秋学期", value="秋学期"),
-        ]
+        ],
+        画質=[
+            app_commands.Choice(name="最適化（標準）", value="optimized"),
+            app_commands.Choice(name="プレビュー（縮小版）", value="thumbnail"),
+            app_commands.Choice(name="オリジナル", value="original"),
+        ],
     )
-    async def yearly_schedule(interaction: discord.Interaction, 学期: str = None):
-        # 現在のスクリプトからの相対パスで画像ファイルの場所を指定
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        public_dir = os.path.join(base_dir, "Public")
-
-        # 春学期の画像ファイルパス
-        spring_path = os.path.join(public_dir, "春.jpg")
-        # 秋学期の画像ファイルパス
-        fall_path = os.path.join(public_dir, "秋.jpg")
-
+    async def yearly_schedule(
+        interaction: discord.Interaction, 学期: str = None, 画質: str = "optimized"
+    ):
         try:
             # 引数がない場合は両方の学期の行事を表示
             if 学期 is None:
-                # 春学期の画像を送信
-                spring_file = discord.File(spring_path, filename="春.jpg")
-                # 秋学期の画像を送信
-                fall_file = discord.File(fall_path, filename="秋.jpg")
-
-                await interaction.response.send_message(
+                await send_semester_images(
+                    interaction,
                     "**2025年度 文教大学行事予定**",
-                    files=[spring_file, fall_file],
-                    silent=True,
+                    ["春学期", "秋学期"],
+                    画質,
                 )
 
             # 春学期のみ表示
             elif 学期 == "春学期":
-                spring_file = discord.File(spring_path, filename="春.jpg")
-                await interaction.response.send_message(
+                await send_semester_images(
+                    interaction,
                     "**2025年度 文教大学行事予定 (春学期)**",
-                    files=[spring_file],
-                    silent=True,
+                    ["春学期"],
+                    画質,
                 )
 
             # 秋学期のみ表示
             elif 学期 == "秋学期":
-                fall_file = discord.File(fall_path, filename="秋.jpg")
-                await interaction.response.send_message(
+                await send_semester_images(
+                    interaction,
                     "**2025年度 文教大学行事予定 (秋学期)**",
-                    files=[fall_file],
-                    silent=True,
+                    ["秋学期"],
+                    画質,
                 )
 
         except FileNotFoundError as e:
-            await interaction.response.send_message(
-                f"ファイルが見つかりませんでした: {str(e)}", ephemeral=True
-            )
+            await send_error(interaction, f"ファイルが見つかりませんでした: {str(e)}")
         except Exception as e:
-            await interaction.response.send_message(
-                f"エラーが発生しました: {str(e)}", ephemeral=True
-            )
+            await send_error(interaction, f"エラーが発生しました: {str(e)}")
@@ -1,187 +1,508 @@
 import json
 import discord
+import io
 import os
+import tempfile
 from discord import app_commands
 from datetime import datetime
+from file_access import file_access
+from seminar_db import CourseSchedule, SeminarDatabase
+from seminar_ics import IcsCache
+from seminar_store import schedule_store, today_jst
 
 
 # 設定ファイルを読み込む関数
-def load_config():
+async def load_config():
     try:
         # 絶対パスで指定
         base_dir = os.path.dirname(os.path.abspath(__file__))
         config_path = os.path.join(base_dir, "config.json")
-        with open(config_path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        return await file_access.read_json(config_path)
     except FileNotFoundError:
         # デフォルト設定を返す
         return {"use_embed": True, "default_color": "#3498db"}
 
 
 # 次のゼミ情報を取得する関数
-def get_next_seminar():
+async def get_next_seminar():
     try:
-        # 絶対パスで指定
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        schedule_path = os.path.join(base_dir, "Public", "ゼミ日程.json")
-        with open(schedule_path, "r", encoding="utf-8") as f:
-            schedules = json.load(f)
-
-        # 現在の日時を取得
-        current_date = datetime.now().strftime("%Y-%m-%d")
-
-        # 次回の日程を探す
-        for schedule in schedules:
-            if schedule["date"] >= current_date:
-                return schedule
-        return None
+        entry = (await schedule_store.get()).next_entry()
+        return entry.raw if entry else None
     except Exception as e:
         print(f"ゼミ日程の取得エラー: {str(e)}")
         return None
 
 
+# 次回の日程の送信内容を作成する関数
+# sourceはScheduleSnapshot（JSONファイル）かseminar_db.CourseSchedule（コース別）
+def render_next(source, today, use_embed, embed_color):
+    next_schedule = source.next_entry(today)
+    if not next_schedule:
+        return {"content": "次回のゼミ日程はありません。"}
+
+    if use_embed:
+        # Discord標準のEmbedを使用して次回の日程を表示
+        embed = discord.Embed(
+            title="次回のゼミ日程",
+            description="",
+            color=embed_color,
+        )
+        embed.add_field(name="日付", value=next_schedule.date_label, inline=True)
+        embed.add_field(name="時間", value=next_schedule.time, inline=True)
+        embed.add_field(name="科目", value=next_schedule.subject, inline=True)
+        embed.add_field(name="週目", value=next_schedule.number, inline=False)
+        return {"embed": embed}
+
+    # テキストベースでのメッセージを送信
+    response = f"**次回のゼミ日程**\n"
+    response += f"📅 日付: {next_schedule.date_label}\n"
+    response += f"⏰ 時間: {next_schedule.time}\n"
+    # response += f"📚 科目: {next_schedule.subject}\n"
+    response += f"🔢 週回数: {next_schedule.number}"
+    return {"content": response}
+
+
+# 一覧の1ページあたりの件数
+PAGE_SIZE = 10
+# 取り込むJSONファイルの最大サイズ（バイト）
+MAX_IMPORT_SIZE = 1024 * 1024
+# メッセージ本文の上限文字数
+MESSAGE_LIMIT = 2000
+# Embedのフィールド値の上限文字数
+FIELD_LIMIT = 1024
+# 検索結果に表示する最大件数
+SEARCH_LIMIT = 20
+
+
+# 一覧のページ数を返す関数
+def page_count(source):
+    return max(1, -(-source.count() // PAGE_SIZE))
+
+
+# 一覧の1行を作成する関数
+def format_entry_line(entry):
+    return f"・{entry.date_label} {entry.time} {entry.number}"
+
+
+# 行を連結してフィールドの上限文字数に収める関数
+def join_lines(lines):
+    value = "\n".join(lines)
+    if len(value) > FIELD_LIMIT:
+        value = value[: FIELD_LIMIT - 1] + "…"
+    return value
+
+
+# 全ての日程の送信内容を1ページ分だけ作成する関数
+def render_list(source, today, page=0):
+    pages = page_count(source)
+    page = min(max(page, 0), pages - 1)
+
+    embed = discord.Embed(
+        title="ゼミ日程一覧",
+        description=source.description,
+        color=discord.Color.green(),
+    )
+    if pages > 1:
+        embed.set_footer(text=f"{page + 1} / {pages} ページ")
+
+    # 今後の予定 → 過去の予定 の順に並べたときの、このページの範囲だけ取り出す
+    start = page * PAGE_SIZE
+    upcoming_schedules, past_schedules = source.list_page(
+        today, start, start + PAGE_SIZE
+    )
+
+    # 未来の予定を表示
+    if upcoming_schedules:
+        embed.add_field(
+            name="【今後の予定】",
+            value=join_lines([format_entry_line(s) for s in upcoming_schedules]),
+            inline=False,
+        )
+    elif page == 0:
+        embed.add_field(name="【今後の予定】", value="予定はありません", inline=False)
+
+    # 過去の予定を表示
+    if past_schedules:
+        embed.add_field(
+            name="【過去の予定】",
+            value=join_lines([format_entry_line(s) for s in past_schedules]),
+            inline=False,
+        )
+
+    return {"embed": embed}
+
+
+# 検索結果の送信内容を作成する関数
+def render_search(source, results, conditions):
+    embed = discord.Embed(
+        title="ゼミ日程の検索結果",
+        description=f"{source.description}\n条件: {conditions}",
+        color=discord.Color.green(),
+    )
+    if results:
+        lines = [format_entry_line(entry) for entry in results[:SEARCH_LIMIT]]
+        if len(results) > SEARCH_LIMIT:
+            lines.append(f"ほか{len(results) - SEARCH_LIMIT}件")
+        embed.add_field(
+            name=f"【該当する予定】({len(results)}件)",
+            value=join_lines(lines),
+            inline=False,
+        )
+    else:
+        embed.add_field(
+            name="【該当する予定】",
+            value="条件に一致する予定はありません",
+            inline=False,
+        )
+    return {"embed": embed}
+
+
+# 検索で指定された日付を読み取る関数（YYYY-MM-DD または YYYY/MM/DD）
+def parse_search_date(text):
+    if not text:
+        return None
+    try:
+        return datetime.strptime(text.strip().replace("/", "-"), "%Y-%m-%d").date()
+    except ValueError:
+        raise ValueError(f"日付は YYYY-MM-DD の形式で指定してください: {text}")
+
+
+# JSONの送信内容を作成する関数（1メッセージに収まらない場合はNoneを返す）
+def render_json(source):
+    # 上限を超えた時点で打ち切るため、少しずつエンコードする
+    limit = MESSAGE_LIMIT - len("```json\n\n```")
+    chunks = []
+    size = 0
+    encoder = json.JSONEncoder(ensure_ascii=False, indent=2)
+    for chunk in encoder.iterencode(source.raw):
+        size += len(chunk)
+        if size > limit:
+            return None
+        chunks.append(chunk)
+    return {"content": f"```json\n{''.join(chunks)}\n```"}
+
+
+# JSONを一時ファイルに少しずつ書き出す関数（スレッドプールで実行する）
+def write_json_file(source):
+    fp = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    encoder = json.JSONEncoder(ensure_ascii=False, indent=2)
+    for chunk in encoder.iterencode(source.raw):
+        fp.write(chunk.encode("utf-8"))
+    fp.seek(0)
+    return fp
+
+
+# JSONを添付ファイルとして作成する関数
+async def build_json_attachment(source):
+    fp = await file_access.run(write_json_file, source)
+    return discord.File(fp, filename="ゼミ日程.json")
+
+
+# ゼミ日程一覧のページ送りボタン
+class SchedulePageView(discord.ui.View):
+    def __init__(self, render_page, pages):
+        super().__init__(timeout=300)
+        self.render_page = render_page
+        self.pages = pages
+        self.page = 0
+        self.message = None
+        self._update_buttons()
+
+    def _update_buttons(self):
+        self.prev_button.disabled = self.page <= 0
+        self.next_button.disabled = self.page >= self.pages - 1
+
+    async def _show(self, interaction):
+        self._update_buttons()
+        # 表示するページだけを作成（作成済みならキャッシュから取得）
+        payload = await self.render_page(self.page)
+        await interaction.response.edit_message(**payload, view=self)
+
+    @discord.ui.button(label="前へ", style=discord.ButtonStyle.secondary, emoji="◀️")
+    async def prev_button(
+        self, interaction: discord.Interaction, button: discord.ui.Button
+    ):
+        self.page = max(self.page - 1, 0)
+        await self._show(interaction)
+
+    @discord.ui.button(label="次へ", style=discord.ButtonStyle.secondary, emoji="▶️")
+    async def next_button(
+        self, interaction: discord.Interaction, button: discord.ui.Button
+    ):
+        self.page = min(self.page + 1, self.pages - 1)
+        await self._show(interaction)
+
+    async def on_timeout(self):
+        # 時間切れになったらボタンを無効化する
+        if self.message:
+            for item in self.children:
+                item.disabled = True
+            try:
+                await self.message.edit(view=self)
+            except discord.HTTPException:
+                pass
+
+
+# 日程を読む関数を呼び出す関数
+# データベースは取り込み中にロックを持ち続けるため、問い合わせはスレッドプールで行う
+# JSONファイルの日程はメモリ上にあるので、そのまま呼び出す
+async def read_source(source, func, *args):
+    if isinstance(source, CourseSchedule):
+        return await file_access.run(func, *args)
+    return func(*args)
+
+
+# 作成済みの送信内容を保持するキャッシュ
+class SeminarRenderCache:
+    def __init__(self):
+        self._generations = {}  # 日程のキー -> (日付, バージョン)
+        self._payloads = {}  # 日程のキー -> {送信内容のキー: 送信内容}
+
+    def _bucket(self, source, today):
+        # 日付（日本時間）か日程のバージョンが変わったらその日程の分を全て破棄する
+        generation = (today, source.version)
+        if self._generations.get(source.key) != generation:
+            self._generations[source.key] = generation
+            self._payloads[source.key] = {}
+        return self._payloads[source.key]
+
+    async def pages(self, source, today):
+        """一覧のページ数を返します"""
+        bucket = self._bucket(source, today)
+        if "pages" not in bucket:
+            bucket["pages"] = await read_source(source, page_count, source)
+        return bucket["pages"]
+
+    async def get(self, option, source, today, config, page=0):
+        """送信内容を返します（日付か日程が変わるまで使い回します）"""
+        bucket = self._bucket(source, today)
+
+        use_embed = config.get("use_embed", True)
+        default_color = config.get("default_color", "#3498db")
+        key = (option, use_embed, default_color, page)
+
+        if key not in bucket:
+            # 一覧とJSONの作成は日程全体を読むため、常にスレッドプールで行う
+            if option == "json":
+                payload = await file_access.run(render_json, source)
+            elif option == "次回":
+                embed_color = int(default_color.replace("#", "0x"), 16)
+                payload = await read_source(
+                    source, render_next, source, today, use_embed, embed_color
+                )
+            else:
+                payload = await file_access.run(render_list, source, today, page)
+            bucket[key] = payload
+        return bucket[key]
+
+
 # ゼミ日程コマンドを設定する関数
 def setup_seminar_command(tree):
+    render_cache = SeminarRenderCache()
+    ics_cache = IcsCache()
+    seminar_db = SeminarDatabase()
+
+    # 表示する日程を選ぶ関数
+    # コースが登録されているサーバーではデータベース、それ以外はJSONファイルを使う
+    async def resolve_source(interaction, course):
+        if interaction.guild_id is not None:
+            source = seminar_db.get_course(interaction.guild_id, course)
+            if source is not None:
+                return source
+        if course is not None:
+            raise ValueError(f"コース「{course}」は登録されていません")
+        return await schedule_store.get()
+
+    async def course_autocomplete(interaction: discord.Interaction, current: str):
+        if interaction.guild_id is None:
+            return []
+        return [
+            app_commands.Choice(name=course, value=course)
+            for course in seminar_db.courses(interaction.guild_id)
+            if current in course
+        ][:25]
+
+    # 自動補完用のインデックスを取得する関数
+    # 読み込み・取り込み時に作成済みのため、通常はファイルもDBも読まずに返せる
+    async def get_indexes(interaction):
+        source = await resolve_source(interaction, interaction.namespace.コース)
+        indexes = source.indexes
+        if indexes is None:
+            indexes = await file_access.run(source.build_indexes)
+        return indexes
+
+    def make_autocomplete(field):
+        async def autocomplete(interaction: discord.Interaction, current: str):
+            try:
+                indexes = await get_indexes(interaction)
+            except Exception:
+                return []
+            return [
+                app_commands.Choice(name=value, value=value)
+                for value in getattr(indexes, field).search(current)
+            ]
+
+        return autocomplete
+
     @tree.command(name="ゼミ日程", description="ゼミの日程を表示します")
     @app_commands.choices(
         オプション=[
             app_commands.Choice(name="次回", value="次回"),
             app_commands.Choice(name="json", value="json"),
+            app_commands.Choice(name="カレンダー(.ics)", value="ics"),
         ]
     )
+    @app_commands.describe(
+        コース="表示するコース（未指定の場合は最初のコース）",
+        科目="科目で絞り込み",
+        回="回数（例: 4回目）で絞り込み",
+        開始日="この日以降の予定に絞り込み（YYYY-MM-DD）",
+        終了日="この日以前の予定に絞り込み（YYYY-MM-DD）",
+    )
+    @app_commands.autocomplete(
+        コース=course_autocomplete,
+        科目=make_autocomplete("subjects"),
+        回=make_autocomplete("numbers"),
+        開始日=make_autocomplete("dates"),
+        終了日=make_autocomplete("dates"),
+    )
     async def seminar_schedule(
-        interaction: discord.Interaction, オプション: str = None
+        interaction: discord.Interaction,
+        オプション: str = None,
+        コース: str = None,
+        科目: str = None,
+        回: str = None,
+        開始日: str = None,
+        終了日: str = None,
     ):
         try:
             # 設定を読み込む
-            config = load_config()
-            use_embed = config.get("use_embed", True)
-            embed_color = int(
-                config.get("default_color", "#3498db").replace("#", "0x"), 16
-            )
+            config = await load_config()
 
-            # JSONファイルからゼミ日程を絶対パスで読み込み
-            base_dir = os.path.dirname(os.path.abspath(__file__))
-            schedule_path = os.path.join(base_dir, "Public", "ゼミ日程.json")
-            with open(schedule_path, "r", encoding="utf-8") as f:
-                schedules = json.load(f)
-
-            # 現在の日時を取得
-            current_date = datetime.now().strftime("%Y-%m-%d")
-
-            # オプションに応じた処理
-            if オプション == "json":
-                # JSONをそのまま返す
-                json_str = json.dumps(schedules, ensure_ascii=False, indent=2)
-                await interaction.response.send_message(
-                    f"```json\n{json_str}\n```", silent=True
+            # 表示する日程を取得（JSONファイルは変わった時だけ読み直す）
+            source = await resolve_source(interaction, コース)
+
+            if 科目 or 回 or 開始日 or 終了日:
+                # 検索条件が指定された場合は一致する予定だけを表示する
+                start, end = parse_search_date(開始日), parse_search_date(終了日)
+                results = await file_access.run(source.search, 科目, 回, start, end)
+                conditions = " / ".join(
+                    f"{name}: {value}"
+                    for name, value in (
+                        ("科目", 科目),
+                        ("回", 回),
+                        ("開始日", 開始日),
+                        ("終了日", 終了日),
+                    )
+                    if value
                 )
+                payload = render_search(source, results, conditions)
+                await interaction.response.send_message(**payload, silent=True)
                 return
 
-            elif オプション == "次回":
-                # 次回の日程だけを返す
-                next_schedule = None
-                for schedule in schedules:
-                    if schedule["date"] >= current_date:
-                        next_schedule = schedule
-                        break
-
-                if next_schedule:
-                    if use_embed:
-                        # Discord標準のEmbedを使用して次回の日程を表示
-                        embed = discord.Embed(
-                            title="次回のゼミ日程",
-                            description="",
-                            color=embed_color,
-                        )
-                        embed.add_field(
-                            name="日付",
-                            value=format_date(next_schedule["date"]),
-                            inline=True,
-                        )
-                        embed.add_field(
-                            name="時間", value=next_schedule["time"], inline=True
-                        )
-                        embed.add_field(
-                            name="科目", value=next_schedule["subject"], inline=True
-                        )
-                        embed.add_field(
-                            name="週目", value=next_schedule["number"], inline=False
-                        )
-                        await interaction.response.send_message(
-                            embed=embed, silent=True
-                        )
-                    else:
-                        # テキストベースでのメッセージを送信
-                        response = f"**次回のゼミ日程**\n"
-                        response += f"📅 日付: {format_date(next_schedule['date'])}\n"
-                        response += f"⏰ 時間: {next_schedule['time']}\n"
-                        # response += f"📚 科目: {next_schedule['subject']}\n"
-                        response += f"🔢 週回数: {next_schedule['number']}"
-                        await interaction.response.send_message(response, silent=True)
-                else:
-                    await interaction.response.send_message(
-                        "次回のゼミ日程はありません。", silent=True
-                    )
+            if オプション == "ics":
+                # 内容が同じ間は作成済みのバイト列をそのまま添付する
+                data = await ics_cache.get(source)
+                file = discord.File(io.BytesIO(data), filename="ゼミ日程.ics")
+                await interaction.response.send_message(file=file, silent=True)
                 return
 
-            else:
-                # 全ての日程を表示
-                embed = discord.Embed(
-                    title="ゼミ日程一覧",
-                    description="卒業研究Ⅰのゼミ日程です",
-                    color=discord.Color.green(),
-                )
+            today = today_jst()
 
-                upcoming_schedules = []
-                past_schedules = []
-
-                for schedule in schedules:
-                    # 日付でソートして現在より前か後かを判断
-                    if schedule["date"] >= current_date:
-                        upcoming_schedules.append(schedule)
-                    else:
-                        past_schedules.append(schedule)
-
-                # 未来の予定を表示
-                if upcoming_schedules:
-                    embed.add_field(
-                        name="【今後の予定】",
-                        value="\n".join(
-                            [
-                                f"・{format_date(s['date'])} {s['time']} {s['number']}"
-                                for s in upcoming_schedules
-                            ]
-                        ),
-                        inline=False,
-                    )
-                else:
-                    embed.add_field(
-                        name="【今後の予定】", value="予定はありません", inline=False
-                    )
+            # オプションに応じた送信内容をキャッシュから取得
+            payload = await render_cache.get(オプション, source, today, config)
 
-                # 過去の予定を表示
-                if past_schedules:
-                    embed.add_field(
-                        name="【過去の予定】",
-                        value="\n".join(
-                            [
-                                f"・{format_date(s['date'])} {s['time']} {s['number']}"
-                                for s in past_schedules
-                            ]
-                        ),
-                        inline=False,
-                    )
+            if オプション == "json" and payload is None:
+                # 1メッセージに収まらない場合は添付ファイルで送る
+                file = await build_json_attachment(source)
+                await interaction.response.send_message(file=file, silent=True)
+                return
+
+            pages = await render_cache.pages(source, today)
+            if オプション in ("json", "次回") or pages == 1:
+                await interaction.response.send_message(**payload, silent=True)
+                return
+
+            # 一覧が複数ページになる場合はページ送りボタンを付ける
+            async def render_page(page):
+                # ページ送りの時点での最新の日程から作成する
+                latest = await resolve_source(interaction, コース)
+                return await render_cache.get(
+                    オプション, latest, today_jst(), config, page
+                )
 
-                await interaction.response.send_message(embed=embed, silent=True)
+            view = SchedulePageView(render_page, pages)
+            await interaction.response.send_message(**payload, view=view, silent=True)
+            view.message = await interaction.original_response()
 
         except Exception as e:
             await interaction.response.send_message(
                 f"エラーが発生しました: {str(e)}", silent=True
             )
 
+    # コース別の日程を管理するコマンドグループ
+    manage_group = app_commands.Group(
+        name="ゼミ管理",
+        description="サーバーごとのゼミ日程（コース）を管理するコマンド",
+        guild_only=True,
+        default_permissions=discord.Permissions(manage_guild=True),
+    )
+
+    @manage_group.command(
+        name="インポート", description="JSON形式のゼミ日程をコースとして取り込みます"
+    )
+    @app_commands.describe(
+        コース="取り込み先のコース名（同名のコースは置き換えます）",
+        ファイル="ゼミ日程.jsonと同じ形式のファイル（未指定の場合は既定のファイル）",
+        説明="一覧に表示する説明文",
+    )
+    async def import_course(
+        interaction: discord.Interaction,
+        コース: str,
+        ファイル: discord.Attachment = None,
+        説明: str = "",
+    ):
+        if ファイル is not None and ファイル.size > MAX_IMPORT_SIZE:
+            await interaction.response.send_message(
+                f"ファイルが大きすぎます（{MAX_IMPORT_SIZE // 1024}KBまで）",
+                ephemeral=True,
+            )
+            return
+
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        try:
+            if ファイル is not None:
+                data = await ファイル.read()
+                # 読み込みはイベントループの外で行う
+                items = await file_access.run(json.loads, data.decode("utf-8"))
+            else:
+                items = (await schedule_store.get()).raw
+            count = await file_access.run(
+                seminar_db.import_entries, interaction.guild_id, コース, items, 説明
+            )
+            await interaction.followup.send(
+                f"コース「{コース}」に{count}件のゼミ日程を取り込みました。",
+                ephemeral=True,
+            )
+        except Exception as e:
+            await interaction.followup.send(
+                f"取り込みに失敗しました: {str(e)}", ephemeral=True
+            )
+
+    @manage_group.command(name="削除", description="コースを削除します")
+    @app_commands.describe(コース="削除するコース名")
+    @app_commands.autocomplete(コース=course_autocomplete)
+    async def delete_course(interaction: discord.Interaction, コース: str):
+        deleted = await file_access.run(
+            seminar_db.delete_course, interaction.guild_id, コース
+        )
+        if not deleted:
+            await interaction.response.send_message(
+                f"コース「{コース}」は登録されていません。", ephemeral=True
+            )
+            return
+        await interaction.response.send_message(
+            f"コース「{コース}」を削除しました。", ephemeral=True
+        )
 
-# 日付のフォーマットを整える関数（YYYY-MM-DD → YYYY年MM月DD日）
-def format_date(date_str):
-    date_obj = datetime.strptime(date_str, "%Y-%m-%d")
-    return date_obj.strftime("%Y年%m月%d日")
+    tree.add_command(manage_group)
@@ -0,0 +1,269 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+from seminar_store import ScheduleIndexes, parse_entry
+
+# データベースファイルの保存先
+DB_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "Public", "ゼミ日程.db"
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS courses (
+    guild_id INTEGER NOT NULL,
+    course TEXT NOT NULL,
+    description TEXT NOT NULL DEFAULT '',
+    version INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (guild_id, course)
+);
+CREATE TABLE IF NOT EXISTS sessions (
+    guild_id INTEGER NOT NULL,
+    course TEXT NOT NULL,
+    date TEXT NOT NULL,
+    time TEXT NOT NULL DEFAULT '',
+    subject TEXT NOT NULL DEFAULT '',
+    number TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_guild_course_date
+    ON sessions (guild_id, course, date);
+-- コースを削除しても戻らないバージョンの通し番号
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO counters (name, value)
+    SELECT 'version', COALESCE(MAX(version), 0) FROM courses;
+"""
+
+SESSION_COLUMNS = "date, time, subject, number"
+
+
+# 行をSeminarEntryに変換する関数
+def row_to_entry(row):
+    return parse_entry(
+        {"date": row[0], "time": row[1], "subject": row[2], "number": row[3]}
+    )
+
+
+# データベース上の1コース分の日程
+# ScheduleSnapshotと同じメソッドを持ち、ゼミ日程の表示処理からそのまま使える
+class CourseSchedule:
+    def __init__(self, db, guild_id, course, version, description):
+        self.db = db
+        self.guild_id = guild_id
+        self.course = course
+        self.version = version
+        self.description = description or f"{course}のゼミ日程です"
+        self.key = ("db", guild_id, course)
+
+    def _where(self, condition=""):
+        return f"WHERE guild_id = ? AND course = ? {condition}"
+
+    def next_entry(self, today):
+        """次回（今日を含む）のエントリを返します"""
+        rows = self.db.query(
+            f"SELECT {SESSION_COLUMNS} FROM sessions {self._where('AND date >= ?')} "
+            "ORDER BY date, rowid LIMIT 1",
+            (self.guild_id, self.course, today.isoformat()),
+        )
+        return row_to_entry(rows[0]) if rows else None
+
+    @property
+    def indexes(self):
+        """自動補完用のインデックスを返します（未作成の場合はNone）"""
+        return self.db.cached_indexes(self.guild_id, self.course, self.version)
+
+    def build_indexes(self):
+        """自動補完用のインデックスを作成して返します（スレッドプールから呼び出す）"""
+        indexes = self.indexes
+        if indexes is None:
+            indexes = ScheduleIndexes([parse_entry(item) for item in self.raw])
+            self.db.store_indexes(self.guild_id, self.course, self.version, indexes)
+        return indexes
+
+    def search(self, subject=None, number=None, start=None, end=None):
+        """条件に一致するエントリを日付順に返します"""
+        conditions = []
+        params = [self.guild_id, self.course]
+        for column, operator, value in (
+            ("date", ">=", start.isoformat() if start else None),
+            ("date", "<=", end.isoformat() if end else None),
+            ("subject", "=", subject),
+            ("number", "=", number),
+        ):
+            if value:
+                conditions.append(f"AND {column} {operator} ?")
+                params.append(value)
+        rows = self.db.query(
+            f"SELECT {SESSION_COLUMNS} FROM sessions {self._where(' '.join(conditions))} "
+            "ORDER BY date, rowid",
+            params,
+        )
+        return [row_to_entry(row) for row in rows]
+
+    def count(self):
+        """エントリの件数を返します"""
+        return self.db.query(
+            f"SELECT COUNT(*) FROM sessions {self._where()}",
+            (self.guild_id, self.course),
+        )[0][0]
+
+    def _range(self, condition, today, offset, limit):
+        if limit <= 0:
+            return []
+        rows = self.db.query(
+            f"SELECT {SESSION_COLUMNS} FROM sessions {self._where(condition)} "
+            "ORDER BY date, rowid LIMIT ? OFFSET ?",
+            (self.guild_id, self.course, today.isoformat(), limit, offset),
+        )
+        return [row_to_entry(row) for row in rows]
+
+    def list_page(self, today, start, end):
+        """今後の予定 → 過去の予定 の順に並べたときの [start, end) の範囲を返します"""
+        upcoming_count = self.db.query(
+            f"SELECT COUNT(*) FROM sessions {self._where('AND date >= ?')}",
+            (self.guild_id, self.course, today.isoformat()),
+        )[0][0]
+        upcoming_start = min(start, upcoming_count)
+        upcoming = self._range(
+            "AND date >= ?",
+            today,
+            upcoming_start,
+            min(end, upcoming_count) - upcoming_start,
+        )
+        past_start = max(start - upcoming_count, 0)
+        past = self._range(
+            "AND date < ?", today, past_start, max(end - upcoming_count, 0) - past_start
+        )
+        return upcoming, past
+
+    @property
+    def raw(self):
+        """JSONファイルと同じ形式のリストを返します"""
+        rows = self.db.query(
+            f"SELECT {SESSION_COLUMNS} FROM sessions {self._where()} ORDER BY date, rowid",
+            (self.guild_id, self.course),
+        )
+        return [
+            {"date": row[0], "time": row[1], "subject": row[2], "number": row[3]}
+            for row in rows
+        ]
+
+
+# サーバー・コースごとのゼミ日程を保存するSQLiteデータベース
+class SeminarDatabase:
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._conn.executescript(SCHEMA)
+            # コース一覧はメモリにも保持し、コマンドごとの問い合わせを省く
+            self._courses = {
+                (guild_id, course): (version, description)
+                for guild_id, course, version, description in self._conn.execute(
+                    "SELECT guild_id, course, version, description FROM courses"
+                )
+            }
+        # (guild_id, コース) -> (バージョン, ScheduleIndexes)
+        self._indexes = {}
+
+    def query(self, sql, params=()):
+        """SELECT文を実行して全ての行を返します（スレッドプールから呼び出す）"""
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def courses(self, guild_id):
+        """サーバーに登録されているコース名の一覧を返します"""
+        return sorted(course for g, course in self._courses if g == guild_id)
+
+    def get_course(self, guild_id, course=None):
+        """コースの日程を返します（コース未指定の場合は最初のコース）"""
+        if course is None:
+            courses = self.courses(guild_id)
+            if not courses:
+                return None
+            course = courses[0]
+        meta = self._courses.get((guild_id, course))
+        if meta is None:
+            return None
+        version, description = meta
+        return CourseSchedule(self, guild_id, course, version, description)
+
+    def cached_indexes(self, guild_id, course, version):
+        """作成済みの自動補完用インデックスを返します"""
+        cached = self._indexes.get((guild_id, course))
+        return cached[1] if cached and cached[0] == version else None
+
+    def store_indexes(self, guild_id, course, version, indexes):
+        """自動補完用インデックスを保持します"""
+        self._indexes[(guild_id, course)] = (version, indexes)
+
+    def import_entries(self, guild_id, course, items, description=""):
+        """JSON形式の日程でコースの内容を置き換え、取り込んだ件数を返します"""
+        # 不正な日付があればここで例外にする
+        entries = [parse_entry(item) for item in items]
+        rows = [
+            (guild_id, course, e.date.isoformat(), e.time, e.subject, e.number)
+            for e in entries
+        ]
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM sessions WHERE guild_id = ? AND course = ?",
+                (guild_id, course),
+            )
+            self._conn.executemany(
+                "INSERT INTO sessions (guild_id, course, date, time, subject, number) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            # 削除後に同じ名前で取り込んでも以前のバージョンと重ならないよう、
+            # バージョンは全コース共通の通し番号にする
+            self._conn.execute(
+                "UPDATE counters SET value = value + 1 WHERE name = 'version'"
+            )
+            version = self._conn.execute(
+                "SELECT value FROM counters WHERE name = 'version'"
+            ).fetchone()[0]
+            self._conn.execute(
+                "INSERT INTO courses (guild_id, course, description, version) "
+                "VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (guild_id, course) DO UPDATE SET "
+                "description = excluded.description, version = excluded.version",
+                (guild_id, course, description, version),
+            )
+        self._courses[(guild_id, course)] = (version, description)
+        # 取り込んだ時点で自動補完用のインデックスも作成しておく
+        self.store_indexes(guild_id, course, version, ScheduleIndexes(entries))
+        return len(rows)
+
+    def delete_course(self, guild_id, course):
+        """コースを削除し、削除したかどうかを返します"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM sessions WHERE guild_id = ? AND course = ?",
+                (guild_id, course),
+            )
+            deleted = self._conn.execute(
+                "DELETE FROM courses WHERE guild_id = ? AND course = ?",
+                (guild_id, course),
+            ).rowcount
+        self._courses.pop((guild_id, course), None)
+        self._indexes.pop((guild_id, course), None)
+        return deleted > 0
+
+
+# コマンドラインから既存のJSONを取り込む
+# 使い方: python seminar_db.py <サーバーID> <コース名> <JSONファイル>
+if __name__ == "__main__":
+    if len(sys.argv) != 4:
+        print("使い方: python seminar_db.py <サーバーID> <コース名> <JSONファイル>")
+        sys.exit(1)
+
+    guild_id, course, json_path = int(sys.argv[1]), sys.argv[2], sys.argv[3]
+    with open(json_path, "r", encoding="utf-8") as f:
+        items = json.load(f)
+    count = SeminarDatabase().import_entries(guild_id, course, items)
+    print(f"{course} に {count} 件のゼミ日程を取り込みました")
@@ -0,0 +1,149 @@
+import hashlib
+import json
+from collections import Counter, OrderedDict
+from datetime import datetime, timedelta, timezone
+from file_access import file_access
+from seminar_store import parse_entry
+
+# iCalendarの1行の上限（オクテット）
+LINE_LIMIT = 75
+
+
+# iCalendarのテキスト値をエスケープする関数
+def escape_text(value):
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\n", "\\n")
+    )
+
+
+# 75オクテットを超える行を折り返す関数（マルチバイト文字の途中では切らない）
+def fold_line(line):
+    parts = []
+    current = b""
+    for char in line:
+        encoded = char.encode("utf-8")
+        # 2行目以降は先頭の空白1文字分を含めて数える
+        limit = LINE_LIMIT if not parts else LINE_LIMIT - 1
+        if len(current) + len(encoded) > limit:
+            parts.append(current)
+            current = b""
+        current += encoded
+    parts.append(current)
+    return b"\r\n ".join(parts)
+
+
+# UTCの日時をiCalendar形式にする関数
+def format_utc(dt):
+    return dt.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+# 予定のUIDを返す関数
+# 日程を取り込み直しても同じ予定は同じUIDになるよう、日程の名前と予定の日時・回数だけから作る
+# （カレンダーアプリはUIDが同じ予定を更新し、違う予定は別の予定として追加する）
+def event_uid(source_key, entry, occurrence):
+    data = json.dumps(
+        [source_key, entry.date.isoformat(), entry.time, entry.number],
+        ensure_ascii=False,
+    ).encode("utf-8")
+    uid = hashlib.sha256(data).hexdigest()[:16]
+    # 日時と回数まで同じ予定が複数ある場合は、何番目かで区別する
+    if occurrence:
+        uid += f"-{occurrence}"
+    return f"{uid}@lyra"
+
+
+# ゼミ日程のエントリからiCalendarのバイト列を作成する関数
+def build_ics(entries, calendar_name, source_key):
+    stamp = format_utc(datetime.now(timezone.utc))
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//Hamaryo-Space//Lyra//JA",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{escape_text(calendar_name)}",
+        "X-WR-TIMEZONE:Asia/Tokyo",
+    ]
+
+    occurrences = Counter()
+    for entry in entries:
+        summary = " ".join(part for part in (entry.subject, entry.number) if part)
+        identity = (entry.date, entry.time, entry.number)
+        lines += [
+            "BEGIN:VEVENT",
+            f"UID:{event_uid(source_key, entry, occurrences[identity])}",
+            f"DTSTAMP:{stamp}",
+        ]
+        if entry.starts_at and entry.ends_at:
+            lines += [
+                f"DTSTART:{format_utc(entry.starts_at)}",
+                f"DTEND:{format_utc(entry.ends_at)}",
+            ]
+        else:
+            # 時刻が読み取れない場合は終日の予定にする
+            lines += [
+                f"DTSTART;VALUE=DATE:{entry.date:%Y%m%d}",
+                f"DTEND;VALUE=DATE:{entry.date + timedelta(days=1):%Y%m%d}",
+            ]
+        lines += [
+            f"SUMMARY:{escape_text(summary or 'ゼミ')}",
+            f"DESCRIPTION:{escape_text(entry.time)}",
+            "END:VEVENT",
+        ]
+        occurrences[identity] += 1
+
+    lines.append("END:VCALENDAR")
+    return b"".join(fold_line(line) + b"\r\n" for line in lines)
+
+
+# 日程の内容のハッシュを返す関数
+def content_hash(raw):
+    data = json.dumps(raw, ensure_ascii=False, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+# 作成済みのiCalendarを日程の内容ごとに保持するキャッシュ
+class IcsCache:
+    def __init__(self, max_items=16):
+        self.max_items = max_items
+        self._hashes = {}  # 日程のキー -> (バージョン, 内容のハッシュ)
+        # (日程のキー, 内容のハッシュ) -> iCalendarのバイト列
+        # UIDに日程のキーを含むため、内容が同じでも日程ごとに作成する
+        self._buffers = OrderedDict()
+
+    @staticmethod
+    def _hash_source(source):
+        raw = source.raw
+        return raw, content_hash(raw)
+
+    @staticmethod
+    def _build(raw, calendar_name, source_key):
+        entries = sorted((parse_entry(item) for item in raw), key=lambda e: e.date)
+        return build_ics(entries, calendar_name, source_key)
+
+    async def get(self, source):
+        """日程のiCalendarを返します（内容が同じ間は同じバイト列を使い回します）"""
+        known = self._hashes.get(source.key)
+        if known and known[0] == source.version:
+            buffer_key = (source.key, known[1])
+            if buffer_key in self._buffers:
+                self._buffers.move_to_end(buffer_key)
+                return self._buffers[buffer_key]
+
+        # ハッシュの計算と作成はスレッドプールで行う
+        raw, digest = await file_access.run(self._hash_source, source)
+        self._hashes[source.key] = (source.version, digest)
+        buffer_key = (source.key, digest)
+        if buffer_key not in self._buffers:
+            data = await file_access.run(
+                self._build, raw, source.description, source.key
+            )
+            self._buffers[buffer_key] = data
+            while len(self._buffers) > self.max_items:
+                self._buffers.popitem(last=False)
+        self._buffers.move_to_end(buffer_key)
+        return self._buffers[buffer_key]
@@ -0,0 +1,270 @@
+import asyncio
+import heapq
+import itertools
+import os
+import discord
+from discord import app_commands
+from datetime import datetime, timedelta
+from file_access import file_access
+from seminar import get_next_seminar
+from seminar_store import JST, schedule_store
+
+# 通知設定の保存先
+SETTINGS_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "Public", "ゼミ通知.json"
+)
+# 何分前に通知するか（デフォルト）
+DEFAULT_MINUTES = 30
+# 日程ファイルの変更を確認する最大の間隔（秒）
+RECHECK_SECONDS = 600
+
+
+# ゼミ開始前の通知を管理するクラス
+# 全サーバー分の通知時刻を1つのヒープで持ち、最も早い時刻まで待機する
+class SeminarReminderScheduler:
+    def __init__(
+        self, store=schedule_store, settings_path=SETTINGS_PATH, clock=None, send=None
+    ):
+        self.store = store
+        self.settings_path = settings_path
+        # テストで時刻を差し替えられるようにする
+        self.clock = clock or (lambda: datetime.now(JST))
+        self.send = send or self._send_to_channel
+        self.client = None
+        self.settings = {}  # guild_id -> {"channel_id": int, "minutes": int}
+
+        self._heap = []  # (通知時刻, 通し番号, guild_id, エントリのキー)
+        self._scheduled = {}  # (guild_id, エントリのキー) -> 有効なヒープ要素の通し番号
+        self._entries = {}  # エントリのキー -> SeminarEntry（今後の日程のみ）
+        self._version = None
+        self._counter = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    @staticmethod
+    def entry_key(entry):
+        return (entry.date, entry.time, entry.number)
+
+    def _push(self, guild_id, key, now):
+        entry = self._entries[key]
+        fire_at = entry.starts_at - timedelta(
+            minutes=self.settings[guild_id]["minutes"]
+        )
+        # 通知時刻を過ぎたものは登録しない（再起動時の二重通知を防ぐ）
+        if fire_at <= now:
+            return
+        seq = next(self._counter)
+        self._scheduled[(guild_id, key)] = seq
+        heapq.heappush(self._heap, (fire_at, seq, guild_id, key))
+
+    def _unschedule_guild(self, guild_id):
+        # ヒープからは取り出した時点で無効として捨てる
+        for scheduled_key in [k for k in self._scheduled if k[0] == guild_id]:
+            del self._scheduled[scheduled_key]
+
+    def _compact(self):
+        # 無効な要素が増えすぎたらヒープを作り直す
+        if len(self._heap) > 2 * len(self._scheduled) + 64:
+            self._heap = [
+                item
+                for item in self._heap
+                if self._scheduled.get((item[2], item[3])) == item[1]
+            ]
+            heapq.heapify(self._heap)
+
+    def apply_snapshot(self, snapshot, now):
+        """日程の変更分だけ通知を追加・削除します"""
+        if snapshot.version == self._version:
+            return
+        self._version = snapshot.version
+
+        start = snapshot.upcoming_index(now.date())
+        entries = {
+            self.entry_key(entry): entry
+            for entry in snapshot.entries[start:]
+            if entry.starts_at and entry.starts_at > now
+        }
+        removed = self._entries.keys() - entries.keys()
+        added = entries.keys() - self._entries.keys()
+        self._entries = entries
+
+        for key in removed:
+            for guild_id in self.settings:
+                self._scheduled.pop((guild_id, key), None)
+        for key in added:
+            for guild_id in self.settings:
+                self._push(guild_id, key, now)
+        self._compact()
+
+    def pop_due(self, now):
+        """通知時刻を過ぎた (guild_id, 設定, エントリ) のリストを取り出します"""
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            _, seq, guild_id, key = heapq.heappop(self._heap)
+            if self._scheduled.get((guild_id, key)) != seq:
+                continue
+            del self._scheduled[(guild_id, key)]
+            setting = self.settings.get(guild_id)
+            entry = self._entries.get(key)
+            if setting and entry:
+                due.append((guild_id, setting, entry))
+        return due
+
+    def next_fire_at(self, guild_id):
+        """指定したサーバーの次の通知時刻を返します"""
+        times = [
+            self._entries[key].starts_at
+            - timedelta(minutes=self.settings[guild_id]["minutes"])
+            for g, key in self._scheduled
+            if g == guild_id
+        ]
+        return min(times) if times else None
+
+    def seconds_until_next(self, now):
+        """次の通知までの待機秒数を返します"""
+        delay = RECHECK_SECONDS
+        if self._heap:
+            delay = min(delay, (self._heap[0][0] - now).total_seconds())
+        return max(delay, 0)
+
+    async def run_once(self):
+        """日程の変更を反映して期限の来た通知を送信し、次の待機秒数を返します"""
+        now = self.clock()
+        try:
+            self.apply_snapshot(await self.store.get(), now)
+        except Exception as e:
+            print(f"ゼミ日程の取得エラー: {str(e)}")
+
+        for guild_id, setting, entry in self.pop_due(now):
+            try:
+                await self.send(
+                    guild_id, setting["channel_id"], entry, setting["minutes"]
+                )
+            except Exception as e:
+                print(f"ゼミ通知の送信に失敗しました: {e}")
+
+        return self.seconds_until_next(self.clock())
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            delay = await self.run_once()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def load_settings(self):
+        """保存されている通知設定を読み込みます"""
+        try:
+            data = await file_access.read_json(self.settings_path)
+        except FileNotFoundError:
+            data = {}
+        self.settings = {int(guild_id): setting for guild_id, setting in data.items()}
+
+    async def _save_settings(self):
+        data = {str(guild_id): setting for guild_id, setting in self.settings.items()}
+        await file_access.write_json(self.settings_path, data)
+
+    async def configure(self, guild_id, channel_id, minutes):
+        """サーバーの通知先と通知タイミングを設定します"""
+        self.settings[guild_id] = {"channel_id": channel_id, "minutes": minutes}
+        await self._save_settings()
+
+        self._unschedule_guild(guild_id)
+        now = self.clock()
+        for key in self._entries:
+            self._push(guild_id, key, now)
+        self._compact()
+        self._wakeup.set()
+
+    async def disable(self, guild_id):
+        """サーバーの通知を解除します"""
+        if self.settings.pop(guild_id, None) is not None:
+            await self._save_settings()
+        self._unschedule_guild(guild_id)
+        self._compact()
+
+    async def start(self, client):
+        """通知ループを開始します（既に動いている場合は何もしません）"""
+        self.client = client
+        if self._task and not self._task.done():
+            return
+        await self.load_settings()
+        self._task = asyncio.create_task(self._run())
+
+    async def _send_to_channel(self, guild_id, channel_id, entry, minutes):
+        channel = self.client.get_channel(
+            channel_id
+        ) or await self.client.fetch_channel(channel_id)
+        embed = discord.Embed(
+            title="まもなくゼミが始まります",
+            description=f"{minutes}分後にゼミが始まります",
+            color=discord.Color.orange(),
+        )
+        embed.add_field(name="日付", value=entry.date_label, inline=True)
+        embed.add_field(name="時間", value=entry.time, inline=True)
+        embed.add_field(name="科目", value=entry.subject, inline=True)
+        embed.add_field(name="週目", value=entry.number, inline=False)
+        await channel.send(embed=embed)
+
+
+# ゼミ通知コマンドを設定する関数
+def setup_seminar_reminder_command(tree):
+    scheduler = SeminarReminderScheduler()
+
+    reminder_group = app_commands.Group(
+        name="ゼミ通知",
+        description="ゼミ開始前の通知を設定するコマンド",
+        guild_only=True,
+        default_permissions=discord.Permissions(manage_guild=True),
+    )
+
+    @reminder_group.command(name="設定", description="ゼミ開始前の通知先を設定します")
+    @app_commands.describe(
+        チャンネル="通知を送信するチャンネル", 分前="ゼミ開始の何分前に通知するか"
+    )
+    async def configure(
+        interaction: discord.Interaction,
+        チャンネル: discord.TextChannel,
+        分前: app_commands.Range[int, 1, 1440] = DEFAULT_MINUTES,
+    ):
+        await scheduler.configure(interaction.guild_id, チャンネル.id, 分前)
+        await interaction.response.send_message(
+            f"ゼミ開始の{分前}分前に {チャンネル.mention} へ通知します。",
+            ephemeral=True,
+        )
+
+    @reminder_group.command(name="解除", description="ゼミ開始前の通知を解除します")
+    async def disable(interaction: discord.Interaction):
+        await scheduler.disable(interaction.guild_id)
+        await interaction.response.send_message(
+            "ゼミ通知を解除しました。", ephemeral=True
+        )
+
+    @reminder_group.command(name="状態", description="ゼミ通知の設定を表示します")
+    async def status(interaction: discord.Interaction):
+        setting = scheduler.settings.get(interaction.guild_id)
+        if not setting:
+            await interaction.response.send_message(
+                "ゼミ通知は設定されていません。", ephemeral=True
+            )
+            return
+
+        response = f"通知先: <#{setting['channel_id']}>\n"
+        response += f"通知タイミング: ゼミ開始の{setting['minutes']}分前\n"
+
+        next_schedule = await get_next_seminar()
+        if next_schedule:
+            response += f"次回のゼミ: {next_schedule['date']} {next_schedule['time']}\n"
+
+        fire_at = scheduler.next_fire_at(interaction.guild_id)
+        response += (
+            f"次回の通知: {fire_at.strftime('%Y年%m月%d日 %H:%M')}"
+            if fire_at
+            else "次回の通知: なし"
+        )
+        await interaction.response.send_message(response, ephemeral=True)
+
+    tree.add_command(reminder_group)
+    return scheduler
@@ -0,0 +1,213 @@
+import asyncio
+import bisect
+import os
+import re
+import unicodedata
+from datetime import date, datetime, time, timedelta, timezone
+from typing import NamedTuple, Optional
+from file_access import file_access
+
+# ゼミ日程は日本時間で管理する
+JST = timezone(timedelta(hours=9), "JST")
+
+# デフォルトのゼミ日程ファイル
+DEFAULT_SCHEDULE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "Public", "ゼミ日程.json"
+)
+
+
+# 「2限目（10:40 ~ 12:10）」のような時間表記から開始・終了時刻を取り出す正規表現
+TIME_RANGE_PATTERN = re.compile(r"(\d{1,2}):(\d{2})\s*[~〜-]\s*(\d{1,2}):(\d{2})")
+
+
+# 日本時間での今日の日付を返す関数
+def today_jst():
+    return datetime.now(JST).date()
+
+
+# ゼミ日程の1エントリ
+class SeminarEntry(NamedTuple):
+    date: date
+    time: str
+    subject: str
+    number: str
+    raw: dict
+    start: Optional[time] = None
+    end: Optional[time] = None
+
+    @property
+    def day_start(self):
+        """その日の0時（日本時間）を返します"""
+        return datetime.combine(self.date, time(0, 0), tzinfo=JST)
+
+    @property
+    def starts_at(self):
+        """開始日時（日本時間）を返します（時刻が不明な場合はNone）"""
+        if self.start is None:
+            return None
+        return datetime.combine(self.date, self.start, tzinfo=JST)
+
+    @property
+    def ends_at(self):
+        """終了日時（日本時間）を返します（時刻が不明な場合はNone）"""
+        if self.end is None:
+            return None
+        return datetime.combine(self.date, self.end, tzinfo=JST)
+
+    @property
+    def date_label(self):
+        """YYYY年MM月DD日 形式の日付文字列を返します"""
+        return self.date.strftime("%Y年%m月%d日")
+
+
+# 検索用に文字列を正規化する関数（全角・半角と大文字・小文字をそろえる）
+def normalize_key(text):
+    return unicodedata.normalize("NFKC", text).lower()
+
+
+# 前方一致で候補を探すためのインデックス（ソート済みの配列を二分探索する）
+class PrefixIndex:
+    def __init__(self, values):
+        pairs = sorted({(normalize_key(value), value) for value in values if value})
+        self._keys = [key for key, _ in pairs]
+        self._values = [value for _, value in pairs]
+
+    def search(self, prefix, limit=25):
+        """prefixで始まる値を最大limit件返します"""
+        key = normalize_key(prefix or "")
+        start = bisect.bisect_left(self._keys, key)
+        end = bisect.bisect_left(self._keys, key + "\U0010ffff", lo=start)
+        return self._values[start : min(end, start + limit)]
+
+
+# 科目・回数・日付の前方一致インデックス
+class ScheduleIndexes:
+    def __init__(self, entries):
+        self.subjects = PrefixIndex(entry.subject for entry in entries)
+        self.numbers = PrefixIndex(entry.number for entry in entries)
+        self.dates = PrefixIndex(entry.date.isoformat() for entry in entries)
+
+
+# ある時点でのゼミ日程（読み込み後は変更しない）
+class ScheduleSnapshot:
+    # 表示用のキーと説明文（コース別の日程はseminar_db.CourseScheduleを使う）
+    key = "default"
+    description = "卒業研究Ⅰのゼミ日程です"
+
+    def __init__(self, entries, version, raw):
+        self.entries = tuple(entries)
+        self.version = version
+        self.raw = raw
+        # 二分探索用の日付インデックス
+        self.dates = [entry.date for entry in self.entries]
+        # 自動補完用のインデックス（読み込み時に作成しておく）
+        self.indexes = ScheduleIndexes(self.entries)
+
+    def upcoming_index(self, today=None):
+        """today以降の最初のエントリの位置を返します"""
+        return bisect.bisect_left(self.dates, today or today_jst())
+
+    def next_entry(self, today=None) -> Optional[SeminarEntry]:
+        """次回（今日を含む）のエントリを返します"""
+        index = self.upcoming_index(today)
+        return self.entries[index] if index < len(self.entries) else None
+
+    def split(self, today=None):
+        """(過去のエントリ, 今後のエントリ) に分割して返します"""
+        index = self.upcoming_index(today)
+        return self.entries[:index], self.entries[index:]
+
+    def count(self):
+        """エントリの件数を返します"""
+        return len(self.entries)
+
+    def build_indexes(self):
+        """自動補完用のインデックスを返します（読み込み時に作成済み）"""
+        return self.indexes
+
+    def search(self, subject=None, number=None, start=None, end=None):
+        """条件に一致するエントリを日付順に返します"""
+        # 日付の範囲は二分探索で絞り込む
+        lo = bisect.bisect_left(self.dates, start) if start else 0
+        hi = bisect.bisect_right(self.dates, end) if end else len(self.dates)
+        return [
+            entry
+            for entry in self.entries[lo:hi]
+            if (not subject or entry.subject == subject)
+            and (not number or entry.number == number)
+        ]
+
+    def list_page(self, today, start, end):
+        """今後の予定 → 過去の予定 の順に並べたときの [start, end) の範囲を返します"""
+        split = self.upcoming_index(today)
+        upcoming_count = len(self.entries) - split
+        upcoming = self.entries[
+            split + min(start, upcoming_count) : split + min(end, upcoming_count)
+        ]
+        # 過去の予定は今後の予定の後ろに続くので、過去の部分の中での位置に直す
+        past = self.entries[:split][
+            max(start - upcoming_count, 0) : max(end - upcoming_count, 0)
+        ]
+        return upcoming, past
+
+
+# 時間表記から (開始時刻, 終了時刻) を返す関数（読み取れない場合は (None, None)）
+def parse_time_range(text):
+    # 全角の数字・記号を半角にそろえる
+    match = TIME_RANGE_PATTERN.search(unicodedata.normalize("NFKC", text or ""))
+    if not match:
+        return None, None
+    try:
+        start_h, start_m, end_h, end_m = (int(value) for value in match.groups())
+        return time(start_h, start_m), time(end_h, end_m)
+    except ValueError:
+        return None, None
+
+
+# JSONの1要素をSeminarEntryに変換する関数
+def parse_entry(item):
+    start, end = parse_time_range(item.get("time", ""))
+    return SeminarEntry(
+        date=datetime.strptime(item["date"], "%Y-%m-%d").date(),
+        time=item.get("time", ""),
+        subject=item.get("subject", ""),
+        number=item.get("number", ""),
+        raw=item,
+        start=start,
+        end=end,
+    )
+
+
+# ゼミ日程ファイルをメモリ上に保持するクラス
+class SeminarScheduleStore:
+    def __init__(self, path=DEFAULT_SCHEDULE_PATH):
+        self.path = path
+        self._snapshot = None
+        self._signature = None
+        self._version = 0
+        self._lock = asyncio.Lock()
+
+    async def _load(self, signature):
+        raw = await file_access.read_json(self.path)
+
+        # 日付順に並べておく（同日の場合は元の順序を保つ）
+        entries = sorted((parse_entry(item) for item in raw), key=lambda e: e.date)
+
+        self._version += 1
+        self._snapshot = ScheduleSnapshot(entries, self._version, raw)
+        self._signature = signature
+
+    async def get(self):
+        """最新のゼミ日程を返します（ファイルが変わった時だけ読み直します）"""
+        stat = await file_access.stat(self.path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if self._snapshot is None or signature != self._signature:
+            async with self._lock:
+                # 待っている間に他のタスクが読み込んだ場合は何もしない
+                if self._snapshot is None or signature != self._signature:
+                    await self._load(signature)
+        return self._snapshot
+
+
+# 共有のストア
+schedule_store = SeminarScheduleStore()
@@ -1,72 +1,295 @@
+import asyncio
 import discord
 from discord import app_commands
 import datetime
-from collections import Counter
-import matplotlib.pyplot as plt
 import io
+import json
 import os
+import time
+from about import DEVELOPER_ID
+from activity_tracker import ActivityTracker
+from approx_stats import ApproxStats
+from charts import (
+    render_activity_chart,
+    render_analytics_chart,
+    render_member_chart,
+    render_trend_chart,
+)
+from dashboard import Dashboard
+from file_access import file_access
+from member_counters import MemberCounters
+from member_search import SEARCH_LIMIT, MemberSearch
+from message_activity import (
+    HOURS_KEPT,
+    WEEKDAY_LABELS,
+    MessageActivity,
+    current_hour,
+)
+from member_snapshot import MemberSnapshot
+from offload import offload
+from report_cache import DEFAULT_TTL, ReportCache
+from stats_export import HAS_PYARROW, export_guild, file_size
+from stats_history import StatsHistory
+
+
+# 応答済みかどうかに合わせてメッセージを送信する関数
+async def send_response(interaction, **kwargs):
+    if interaction.response.is_done():
+        await interaction.followup.send(**kwargs)
+    else:
+        await interaction.response.send_message(**kwargs)
+
+
+# この人数以上のサーバーでは、サンプルとスケッチによる推定値を表示する
+APPROX_MEMBER_THRESHOLD = 100000
+
+
+# メンバーのスナップショットを作り直すまでの秒数
+SNAPSHOT_TTL = 300
+
+
+# 検索で表示する参加時期の選択肢（日数）
+JOIN_PERIODS = [7, 30, 365]
+
+
+# ダッシュボードのサーバー一覧で、内訳が正確でないサーバーに付ける印
+TOP_GUILD_MARKERS = {"partial": "（一部）", "approximate": "（推定）"}
+
+
+# ファイル読み込みの統計から、平均時間の長い順に表示用の行を返す関数
+def format_read_stats(read_stats, limit=3):
+    slowest = sorted(
+        read_stats.items(), key=lambda item: item[1]["avg_ms"], reverse=True
+    )
+    return [
+        f"{os.path.basename(path)}: 平均{stats['avg_ms']:.1f}ms / "
+        f"最大{stats['max_ms']:.0f}ms（{stats['count']}回"
+        + (f"、失敗{stats['errors']}回" if stats["errors"] else "")
+        + "）"
+        for path, stats in slowest[:limit]
+    ]
+
+
+# 推定値の場合は誤差を付けて人数を表示用の文字列にする関数
+def format_count(stats, key):
+    margin = stats.get("margins", {}).get(key)
+    if margin is None:
+        return f"{stats[key]}"
+    return f"約{stats[key]} (±{margin})"
 
 
 class ServerStats:
-    def __init__(self):
+    def __init__(self, cache_ttl=DEFAULT_TTL, approx_threshold=APPROX_MEMBER_THRESHOLD):
         self.stats_description = """
 **【サーバー統計】**
 このコマンドではDiscordサーバーの様々な統計情報を確認できます。
 メンバー数、ロール分布、チャンネル数など、サーバーの現状を分析できます。
 """
+        # メンバー数はイベントで更新し続け、コマンド実行時は読むだけにする
+        self.member_counters = MemberCounters()
+        self.activity_tracker = ActivityTracker()
+        # メンバー検索の索引
+        self.member_search = MemberSearch()
+        # メッセージ数の集計（本文は読まない）
+        self.message_activity = MessageActivity()
+        # 大規模なサーバー用の近似統計
+        self.approx_threshold = approx_threshold
+        self.approx_stats = ApproxStats()
+        # 同じサーバーで続けて実行された場合は集計結果を使い回す
+        self.report_cache = ReportCache(ttl=cache_ttl)
+        # 統計の推移（一定間隔で記録する）
+        self.history = StatsHistory()
+        # メンバー一覧を取得中のサーバー guild_id -> タスク
+        self._chunking = {}
+        # 分析用のメンバーのスナップショット guild_id -> (作成時刻, スナップショット)
+        self._snapshots = {}
+        # 全サーバーをまとめた統計（Botの運営者向け）
+        self.dashboard = Dashboard(self)
 
-    async def get_member_stats(self, guild):
-        """メンバーに関する統計を取得します"""
-        total_members = guild.member_count
-        humans = len([m for m in guild.members if not m.bot])
-        bots = len([m for m in guild.members if m.bot])
-        online = len([m for m in guild.members if m.status == discord.Status.online])
-        offline = len([m for m in guild.members if m.status == discord.Status.offline])
-
-        # ステータス別にカウント
-        status_counts = {
-            "オンライン": len(
-                [m for m in guild.members if m.status == discord.Status.online]
-            ),
-            "退席中": len(
-                [m for m in guild.members if m.status == discord.Status.idle]
-            ),
-            "取り込み中": len(
-                [m for m in guild.members if m.status == discord.Status.dnd]
-            ),
-            "オフライン": len(
-                [m for m in guild.members if m.status == discord.Status.offline]
+    # 以下のイベント処理はmain.pyのイベントから呼び出す
+    def on_ready(self):
+        # 再接続でキャッシュが作り直された場合に備えて集計を破棄する
+        self.member_counters.reset()
+        self.activity_tracker.reset()
+        self.approx_stats.reset()
+        self.member_search.reset()
+
+    async def start(self, client):
+        """統計の推移の記録を開始します"""
+        await self.history.start(client, self.collect_sample)
+
+    def forget_guild(self, guild_id):
+        """サーバーの集計とキャッシュした結果を破棄します"""
+        self.member_counters.forget_guild(guild_id)
+        self.activity_tracker.forget_guild(guild_id)
+        self.approx_stats.forget_guild(guild_id)
+        self.member_search.forget_guild(guild_id)
+        self._snapshots.pop(guild_id, None)
+        self.report_cache.invalidate(lambda key: key[0] == guild_id)
+
+    def on_guild_remove(self, guild):
+        self.forget_guild(guild.id)
+        self.history.forget_guild(guild.id)
+        # メッセージ数はメンバーキャッシュから作らないので、退出した時だけ破棄する
+        self.message_activity.forget_guild(guild.id)
+
+    def on_member_join(self, member):
+        self.member_counters.on_member_join(member)
+        self.activity_tracker.on_member_join(member)
+        self.approx_stats.observe(member)
+        self.member_search.on_member_join(member)
+
+    def on_member_remove(self, member):
+        self.member_counters.on_member_remove(member)
+        self.activity_tracker.on_member_remove(member)
+        self.approx_stats.on_member_remove(member)
+        self.member_search.on_member_remove(member)
+
+    def on_presence_update(self, before, after):
+        self.member_counters.on_presence_update(before, after)
+        self.activity_tracker.on_presence_update(before, after)
+        self.approx_stats.observe(after)
+
+    def on_member_update(self, before, after):
+        self.member_counters.on_member_update(before, after)
+        self.approx_stats.observe(after)
+        self.member_search.on_member_update(before, after)
+
+    def on_message(self, message):
+        self.message_activity.on_message(message)
+
+    def on_user_update(self, before, after):
+        self.member_search.on_user_update(before, after)
+
+    def on_guild_role_delete(self, role):
+        self.member_counters.forget_role(role)
+        self.member_search.forget_role(role)
+
+    def is_approximate(self, guild):
+        """推定値で集計するサーバーかどうかを返します"""
+        return (guild.member_count or 0) >= self.approx_threshold
+
+    async def _chunk_guild(self, guild):
+        try:
+            await guild.chunk(cache=True)
+            # 取得前の不完全なキャッシュで作った集計を作り直す
+            self.forget_guild(guild.id)
+        finally:
+            self._chunking.pop(guild.id, None)
+
+    def start_chunk(self, guild):
+        """メンバー一覧の取得を開始し、そのタスクを返します（取得中なら同じタスク）"""
+        task = self._chunking.get(guild.id)
+        if task is None:
+            task = self._chunking[guild.id] = asyncio.create_task(
+                self._chunk_guild(guild)
+            )
+            task.add_done_callback(self._log_chunk_error)
+        return task
+
+    @staticmethod
+    def _log_chunk_error(task):
+        # 誰も待っていない場合でも失敗をログに残す
+        if not task.cancelled() and task.exception() is not None:
+            print(f"メンバー一覧の取得に失敗しました: {task.exception()}")
+
+    async def ensure_members_cached(self, interaction):
+        """メンバー一覧が未取得なら取得します（失敗した場合はエラーを送信してFalseを返します）"""
+        guild = interaction.guild
+        # 推定値で集計するサーバーでは、全メンバーの取得はしない
+        if guild.chunked or self.is_approximate(guild):
+            return True
+        # 取得に時間がかかる場合があるので、先に応答を保留しておく
+        if not interaction.response.is_done():
+            await interaction.response.defer()
+        try:
+            await asyncio.shield(self.start_chunk(guild))
+        except Exception:
+            await interaction.followup.send(
+                "メンバー一覧の取得に失敗しました。しばらくしてから再度お試しください",
+                ephemeral=True,
+            )
+            return False
+        return True
+
+    def cache_footprint(self, guild):
+        """サーバーのメンバーキャッシュの状況を返します"""
+        cached = len(guild.members)
+        total = guild.member_count or 0
+        return {
+            "cached_members": cached,
+            "member_count": total,
+            "coverage": cached / total if total else 0.0,
+            "chunked": guild.chunked,
+            "presences": sum(
+                1 for member in guild.members if member.status != discord.Status.offline
             ),
         }
 
-        # モバイルユーザー数
-        mobile_users = sum(
-            1 for m in guild.members if hasattr(m, "is_on_mobile") and m.is_on_mobile()
-        )
+    def print_cache_footprint(self, guilds):
+        """サーバーごとのメンバーキャッシュの状況を表示します"""
+        total = 0
+        for guild in guilds:
+            footprint = self.cache_footprint(guild)
+            total += footprint["cached_members"]
+            print(
+                f"メンバーキャッシュ: {guild.name} "
+                f"{footprint['cached_members']}/{footprint['member_count']}人"
+                f"{'' if footprint['chunked'] else '（未取得）'}"
+            )
+        print(f"メンバーキャッシュ合計: {total}人 ({len(guilds)}サーバー)")
+
+    async def get_member_stats(self, guild):
+        """メンバーに関する統計を取得します"""
+        if self.is_approximate(guild):
+            return self.approx_stats.member_stats(guild)
+
+        total_members = guild.member_count
+        counters = await self.member_counters.load(guild)
+        status_counts = dict(counters.status_counts)
 
         return {
             "total": total_members,
-            "humans": humans,
-            "bots": bots,
-            "online": online,
-            "offline": offline,
+            "humans": counters.humans,
+            "bots": counters.bots,
+            "online": status_counts["オンライン"],
+            "offline": status_counts["オフライン"],
             "status_counts": status_counts,
-            "mobile_users": mobile_users,
+            "mobile_users": counters.mobile,
         }
 
-    async def get_role_stats(self, guild):
+    async def get_role_stats(self, guild, top=5):
         """ロールに関する統計を取得します"""
         roles = guild.roles
+        if self.is_approximate(guild):
+            names = {role.id: role.name for role in roles if not role.is_default()}
+            top_roles = self.approx_stats.top_roles(guild, top, names)
+            return {
+                "total_roles": len(roles) - 1,  # @everyoneを除く
+                "role_counts": dict(top_roles),
+                "top_roles": top_roles,
+                "approximate": True,
+            }
+
+        # role.membersはロールごとに全メンバーを走査するため、集計済みの人数を使う
+        counters = await self.member_counters.load(guild)
         role_counts = {}
 
-        # 各ロールに所属するメンバー数をカウント
+        # 各ロールに所属するメンバー数
         for role in roles:
             if not role.is_default():  # @everyoneを除く
-                role_counts[role.name] = len(role.members)
+                role_counts[role.name] = counters.role_counts.get(role.id, 0)
+
+        # ヒープで上位だけを選ぶ（全件のソートはしない）
+        names = {role.id: role.name for role in roles}
+        top_roles = [
+            (names[role_id], count) for role_id, count in counters.top_roles(top, names)
+        ]
 
         return {
             "total_roles": len(roles) - 1,  # @everyoneを除く
             "role_counts": role_counts,
+            "top_roles": top_roles,
         }
 
     async def get_channel_stats(self, guild):
@@ -84,66 +307,466 @@ class ServerStats:
 
     async def get_activity_stats(self, guild):
         """メンバーのアクティビティに関する統計を取得します"""
-        activities = []
+        if self.is_approximate(guild):
+            return self.approx_stats.activity_stats(guild, 5)
 
-        for member in guild.members:
-            for activity in member.activities:
-                if activity.type == discord.ActivityType.playing:
-                    activities.append(activity.name)
+        # プレゼンス更新で集計済みの値を読むだけにする
+        activities = self.activity_tracker.get(guild)
 
-        # 最も人気のあるゲーム/アクティビティ
-        activity_counter = Counter(activities)
-        popular_activities = activity_counter.most_common(5)
+        # 最も人気のあるゲーム/配信/Spotify
+        popular_activities = activities.top(5)
 
         return {
-            "playing_count": len(activities),
+            "playing_count": activities.kind_counts["playing"],
+            "streaming_count": activities.kind_counts["streaming"],
+            "listening_count": activities.kind_counts["listening"],
             "popular_activities": popular_activities,
         }
 
-    async def create_member_chart(self, stats):
-        """メンバー統計のグラフを作成します"""
-        # グラフサイズ設定
-        plt.figure(figsize=(10, 6))
-
-        # 日本語フォントの設定
-        plt.rcParams["font.family"] = "sans-serif"
-        plt.rcParams["font.sans-serif"] = [
-            "Arial",
-            "Yu Gothic",
-            "Meiryo",
-            "Hiragino Kaku Gothic ProN",
+    async def collect_sample(self, guild):
+        """推移として記録する統計値を返します"""
+        # メンバー一覧の取得はコマンドの初回に任せ、取得済みのサーバーだけを記録する
+        # （ここで取得すると、起動後すぐに全サーバーのメンバーをキャッシュしてしまう）
+        if not guild.chunked and not self.is_approximate(guild):
+            return None
+        member_stats = await self.get_member_stats(guild)
+        channel_stats = await self.get_channel_stats(guild)
+        return {
+            "members": member_stats["total"],
+            "online": member_stats["online"],
+            "bots": member_stats["bots"],
+            "roles": len(guild.roles) - 1,  # @everyoneを除く
+            "channels": channel_stats["total_channels"],
+        }
+
+    async def send_trend(self, interaction, days):
+        """統計の推移のグラフを送信します"""
+        guild = interaction.guild
+        # 記録はメンバー一覧の取得後に始まるので、未取得なら裏で取得しておく
+        if not guild.chunked and not self.is_approximate(guild):
+            self.start_chunk(guild)
+        dates, values = self.history.query(guild.id, days)
+        if len(dates) < 2:
+            await interaction.response.send_message(
+                "まだ推移を表示できるだけの記録がありません。しばらくしてから再度お試しください",
+                ephemeral=True,
+            )
+            return
+
+        await interaction.response.defer()
+        embed = discord.Embed(
+            title=f"📈 {guild.name} - サーバー統計の推移",
+            description=f"直近{days}日間の推移です",
+            color=discord.Color.blue(),
+        )
+        embed.add_field(
+            name="👥 メンバー数",
+            value=f"{values['members'][0]:.0f}人 → {values['members'][-1]:.0f}人",
+            inline=True,
+        )
+        try:
+            png = await offload.run(render_trend_chart, dates, values, days)
+        except Exception as e:
+            embed.add_field(
+                name="エラー",
+                value=f"グラフの生成に失敗しました: {str(e)}",
+                inline=False,
+            )
+            await interaction.followup.send(embed=embed)
+            return
+
+        file = discord.File(io.BytesIO(png), filename="stats_trend.png")
+        embed.set_image(url="attachment://stats_trend.png")
+        await interaction.followup.send(embed=embed, file=file)
+
+    async def send_activity(self, interaction):
+        """メッセージ数のヒートマップを送信します"""
+        guild = interaction.guild
+        activity = self.message_activity.get(guild.id)
+        now = current_hour()
+        week_matrix = activity.heatmap(now) if activity is not None else None
+        total = sum(map(sum, week_matrix)) if week_matrix else 0
+        if total == 0:
+            await interaction.response.send_message(
+                "まだメッセージの記録がありません。しばらくしてから再度お試しください",
+                ephemeral=True,
+            )
+            return
+
+        await interaction.response.defer()
+        embed = discord.Embed(
+            title=f"💬 {guild.name} - メッセージの活動状況",
+            description=f"直近{HOURS_KEPT // 24}日間にBotが記録したメッセージ数です（本文は記録していません）",
+            color=discord.Color.blue(),
+        )
+
+        # 最もメッセージの多い曜日・時間帯
+        busiest = max(
+            ((weekday, hour) for weekday in range(7) for hour in range(24)),
+            key=lambda cell: week_matrix[cell[0]][cell[1]],
+        )
+        embed.add_field(
+            name="📊 概要",
+            value=f"**メッセージ数:** {total}件\n"
+            f"**最も活発な時間帯:** {WEEKDAY_LABELS[busiest[0]]}曜日 {busiest[1]}時台",
+            inline=False,
+        )
+
+        channel_labels, channel_matrix, channel_lines = [], [], []
+        for channel_id, count, hours in activity.top_channels(now, 8):
+            channel = guild.get_channel(channel_id)
+            if channel is None:
+                continue
+            channel_labels.append(f"#{channel.name}")
+            channel_matrix.append(hours)
+            channel_lines.append(f"{channel.mention}: {count}件")
+        if channel_lines:
+            embed.add_field(
+                name="📝 活発なチャンネル",
+                value="\n".join(channel_lines[:5]),
+                inline=True,
+            )
+
+        author_lines = [
+            f"<@{author_id}>: 約{count}件"
+            for author_id, count in activity.top_authors(5)
         ]
+        if author_lines:
+            embed.add_field(
+                name="🗣️ 活発なメンバー", value="\n".join(author_lines), inline=True
+            )
 
-        # 人間とボットの割合の円グラフ
-        plt.subplot(1, 2, 1)
-        labels = ["人間", "ボット"]
-        sizes = [stats["humans"], stats["bots"]]
-        colors = ["#3498db", "#e74c3c"]
-        plt.pie(sizes, labels=labels, colors=colors, autopct="%1.1f%%", startangle=90)
-        plt.title("メンバー構成")
-
-        # ステータス別の棒グラフ
-        plt.subplot(1, 2, 2)
-        status_labels = list(stats["status_counts"].keys())
-        status_values = list(stats["status_counts"].values())
-        colors = ["#2ecc71", "#f1c40f", "#e74c3c", "#95a5a6"]
-        plt.bar(status_labels, status_values, color=colors)
-        plt.title("メンバーステータス")
-        plt.xticks(rotation=45, ha="right")
-
-        plt.tight_layout()
-
-        # 画像をバイトストリームとして保存
-        buffer = io.BytesIO()
-        plt.savefig(buffer, format="png")
-        buffer.seek(0)
-        plt.close()
-
-        return buffer
+        try:
+            png = await offload.run(
+                render_activity_chart,
+                week_matrix,
+                WEEKDAY_LABELS,
+                channel_labels,
+                channel_matrix,
+            )
+        except Exception as e:
+            embed.add_field(
+                name="エラー",
+                value=f"グラフの生成に失敗しました: {str(e)}",
+                inline=False,
+            )
+            await interaction.followup.send(embed=embed)
+            return
 
-    async def create_server_summary(self, interaction, option):
-        """サーバーの統計情報を生成します"""
+        file = discord.File(io.BytesIO(png), filename="message_activity.png")
+        embed.set_image(url="attachment://message_activity.png")
+        await interaction.followup.send(
+            embed=embed, file=file, allowed_mentions=discord.AllowedMentions.none()
+        )
+
+    async def get_snapshot(self, guild):
+        """分析用のメンバーのスナップショットを返します（古い場合は作り直します）"""
+        members = guild.members
+        cached = self._snapshots.get(guild.id)
+        if (
+            cached is not None
+            and time.monotonic() - cached[0] < SNAPSHOT_TTL
+            and len(cached[1]) == len(members)
+        ):
+            return cached[1]
+        # メンバーを走査して配列にする処理はイベントループの外で行う
+        snapshot = await asyncio.to_thread(MemberSnapshot.build, members)
+        self._snapshots[guild.id] = (time.monotonic(), snapshot)
+        return snapshot
+
+    async def send_analytics(self, interaction, days):
+        """参加時期とアカウント年齢の分析を送信します"""
+        guild = interaction.guild
+        if not await self.ensure_members_cached(interaction):
+            return
+        if not interaction.response.is_done():
+            await interaction.response.defer()
+
+        snapshot = await self.get_snapshot(guild)
+        recent, share = snapshot.joined_within(days)
+        month_labels, month_counts = snapshot.join_histogram()
+        age_labels, age_counts = snapshot.account_age_distribution()
+
+        embed = discord.Embed(
+            title=f"🔎 {guild.name} - メンバー分析",
+            description=f"{len(snapshot)}人のメンバーから集計しました",
+            color=discord.Color.blue(),
+        )
+        if self.is_approximate(guild):
+            embed.description += "（キャッシュ済みのメンバーのみ）"
+        embed.add_field(
+            name="📅 最近の参加",
+            value=f"直近{days}日間: {recent}人 ({share * 100:.1f}%)\n"
+            f"ロール未付与の人間: {snapshot.without_roles()}人",
+            inline=False,
+        )
+        embed.add_field(
+            name="🎂 アカウント作成からの期間",
+            value="\n".join(
+                f"{label}: {count}人" for label, count in zip(age_labels, age_counts)
+            ),
+            inline=False,
+        )
+
+        try:
+            png = await offload.run(
+                render_analytics_chart,
+                month_labels,
+                month_counts,
+                age_labels,
+                age_counts,
+            )
+        except Exception as e:
+            embed.add_field(
+                name="エラー",
+                value=f"グラフの生成に失敗しました: {str(e)}",
+                inline=False,
+            )
+            await interaction.followup.send(embed=embed)
+            return
+
+        file = discord.File(io.BytesIO(png), filename="member_analytics.png")
+        embed.set_image(url="attachment://member_analytics.png")
+        await interaction.followup.send(embed=embed, file=file)
+
+    async def send_export(self, interaction, file_format):
+        """メンバーとロールの一覧をファイルで送信します"""
         guild = interaction.guild
+        if not interaction.user.guild_permissions.manage_guild:
+            await interaction.response.send_message(
+                "このコマンドにはサーバー管理権限が必要です", ephemeral=True
+            )
+            return
+        if file_format == "parquet" and not HAS_PYARROW:
+            await interaction.response.send_message(
+                "Parquet形式で出力するにはpyarrowが必要です。CSV形式をお試しください",
+                ephemeral=True,
+            )
+            return
+
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        if not await self.ensure_members_cached(interaction):
+            return
+        counters = await self.member_counters.load(guild)
+        role_counts = dict(counters.role_counts)
+
+        # 一覧の書き出しと圧縮はスレッドで少しずつ行う
+        try:
+            exported = await file_access.run(
+                export_guild, guild.members, guild.roles, role_counts, file_format
+            )
+        except Exception as e:
+            await interaction.followup.send(
+                f"エクスポートに失敗しました: {str(e)}", ephemeral=True
+            )
+            return
+
+        total_size = sum(file_size(fp) for _, fp in exported)
+        if total_size > guild.filesize_limit:
+            for _, fp in exported:
+                fp.close()
+            await interaction.followup.send(
+                f"ファイルが大きすぎるため送信できません（{total_size // 1024}KB）",
+                ephemeral=True,
+            )
+            return
+
+        files = [discord.File(fp, filename=name) for name, fp in exported]
+        await interaction.followup.send(
+            f"{len(guild.members)}人分のメンバーと{len(guild.roles) - 1}個のロールを出力しました",
+            files=files,
+            ephemeral=True,
+        )
+
+    def search_members(self, index, guild, query="", role_id=None, days=None):
+        """条件に合うメンバーと検索にかかった時間（ミリ秒）を返します"""
+        started = time.perf_counter()
+        # オートコンプリートで選んだ候補はメンバーIDが入っている
+        if query.isdigit() and int(query) in index.entries:
+            member_ids = [int(query)]
+        else:
+            joined_after = time.time() - days * 86400 if days else None
+            member_ids = index.search(query, role_id, joined_after, SEARCH_LIMIT)
+        members = [guild.get_member(member_id) for member_id in member_ids]
+        elapsed = (time.perf_counter() - started) * 1000
+        return [member for member in members if member is not None], elapsed
+
+    async def member_autocomplete(self, interaction, current):
+        """入力中の文字列に合うメンバーの候補を返します"""
+        guild = interaction.guild
+        if guild is None:
+            return []
+        index = self.member_search.get(guild)
+        if index is None:
+            # 候補は3秒以内に返す必要があるため、索引は裏で作成して今回は候補なしにする
+            asyncio.create_task(self.member_search.load(guild))
+            return []
+        # 他の引数が入力済みなら、その条件でも絞り込む
+        role = getattr(interaction.namespace, "ロール", None)
+        days = getattr(interaction.namespace, "参加期間", None)
+        members, _ = self.search_members(
+            index, guild, current, role.id if role else None, days
+        )
+        return [
+            app_commands.Choice(
+                name=f"{member.display_name} (@{member.name})"[:100],
+                value=str(member.id),
+            )
+            for member in members
+        ]
+
+    async def send_search(self, interaction, query, role, days):
+        """メンバーの検索結果を表示します"""
+        guild = interaction.guild
+        if not await self.ensure_members_cached(interaction):
+            return
+        index = self.member_search.get(guild)
+        if index is None:
+            if not interaction.response.is_done():
+                await interaction.response.defer()
+            index = await self.member_search.load(guild)
+        members, elapsed = self.search_members(
+            index, guild, query or "", role.id if role else None, days
+        )
+
+        conditions = []
+        if query:
+            conditions.append(f"キーワード: {query}")
+        if role:
+            conditions.append(f"ロール: {role.mention}")
+        if days:
+            conditions.append(f"参加: {days}日以内")
+        embed = discord.Embed(
+            title="🔍 メンバー検索",
+            description=" / ".join(conditions) if conditions else "条件なし",
+            color=discord.Color.blue(),
+        )
+
+        if members:
+            lines = []
+            for member in members:
+                joined = (
+                    member.joined_at.strftime("%Y/%m/%d")
+                    if member.joined_at
+                    else "不明"
+                )
+                lines.append(f"{member.mention} (@{member.name}) 参加: {joined}")
+            embed.add_field(
+                name=f"検索結果 ({len(members)}件)",
+                value="\n".join(lines)[:1024],
+                inline=False,
+            )
+        else:
+            embed.add_field(
+                name="検索結果", value="条件に合うメンバーはいません", inline=False
+            )
+
+        embed.set_footer(
+            text=f"検索時間: {elapsed:.1f}ms（最大{SEARCH_LIMIT}件まで表示）"
+        )
+        await send_response(interaction, embed=embed, silent=True)
+
+    async def send_dashboard(self, interaction):
+        """Botが導入されている全サーバーの統計をまとめて表示します（開発者のみ）"""
+        if interaction.user.id != DEVELOPER_ID:
+            await interaction.response.send_message(
+                "このコマンドはBotの開発者のみ使用できます", ephemeral=True
+            )
+            return
+
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        try:
+            result = await self.dashboard.get(interaction.client)
+        except Exception as e:
+            await interaction.followup.send(
+                f"ダッシュボードの集計に失敗しました: {str(e)}", ephemeral=True
+            )
+            return
+
+        totals = result["totals"]
+        # 内訳が正確な値でないサーバーがある場合は、合計に含まれていることを示す
+        notes = []
+        if totals["partial"]:
+            notes.append(
+                f"{totals['partial']}サーバーは内訳がキャッシュ済みのメンバーのみ"
+            )
+        if totals["approximate"]:
+            notes.append(f"{totals['approximate']}サーバーは内訳が推定値")
+        about = "約" if totals["approximate"] else ""
+        embed = discord.Embed(
+            title="Lyra ダッシュボード",
+            description=f"{totals['guilds']}サーバーの統計をまとめて表示しています",
+            color=discord.Color.blue(),
+        )
+        embed.add_field(
+            name="👥 メンバー",
+            value=f"合計: {totals['members']}人\n"
+            f"人間: {about}{totals['humans']}人\n"
+            f"ボット: {about}{totals['bots']}人\n"
+            f"オンライン: {about}{totals['online']}人"
+            + "".join(f"\n※{note}" for note in notes),
+            inline=True,
+        )
+        embed.add_field(
+            name="📝 サーバー構成",
+            value=f"チャンネル: {totals['channels']}個\n"
+            f"ロール: {totals['roles']}個",
+            inline=True,
+        )
+        embed.add_field(
+            name="💾 メンバーキャッシュ",
+            value=f"キャッシュ済み: {totals['cached_members']}人\n"
+            f"取得済み: {totals['chunked']}サーバー\n"
+            f"未取得: {totals['partial']}サーバー\n"
+            f"推定値: {totals['approximate']}サーバー",
+            inline=True,
+        )
+
+        if result["top_guilds"]:
+            top_text = "\n".join(
+                f"{i}. {name}: {members}人{TOP_GUILD_MARKERS.get(kind, '')}"
+                for i, (members, name, kind) in enumerate(result["top_guilds"], 1)
+            )
+            embed.add_field(
+                name="🏆 メンバー数の多いサーバー", value=top_text, inline=False
+            )
+
+        cache = self.report_cache.stats()
+        workers = offload.stats()
+        embed.add_field(
+            name="⚙️ 動作状況",
+            value=f"統計キャッシュのヒット率: {cache['hit_rate'] * 100:.1f}% "
+            f"({cache['entries']}件)\n"
+            f"グラフの描画: {workers['mode']}（実行中 {workers['inflight']}件）",
+            inline=False,
+        )
+        # ストレージが遅いとコマンドの応答も遅くなるので、読み込みの遅いファイルを表示する
+        read_lines = format_read_stats(file_access.stats())
+        if read_lines:
+            embed.add_field(
+                name="💽 ファイル読み込み",
+                value="\n".join(read_lines),
+                inline=False,
+            )
+        if result["failed"]:
+            embed.add_field(
+                name="⚠️ 注意",
+                value=f"{result['failed']}サーバーの集計に失敗しました",
+                inline=False,
+            )
+
+        embed.set_footer(text="集計時刻")
+        embed.timestamp = result["created_at"]
+        await interaction.followup.send(embed=embed, ephemeral=True)
+
+    async def create_member_chart(self, stats):
+        """メンバー統計のグラフを作成します"""
+        # 描画はイベントループの外（ワーカー）で行う
+        png = await offload.run(render_member_chart, stats)
+        return io.BytesIO(png)
+
+    async def build_server_report(self, guild, option):
+        """サーバーの統計情報とEmbedの内容（グラフ画像を含む）を作成します"""
         created_at = guild.created_at.strftime("%Y年%m月%d日")
 
         # タイムゾーンを統一してから計算（Discordのタイムスタンプはawareなので、nowもawareにする）
@@ -155,63 +778,78 @@ class ServerStats:
         role_stats = await self.get_role_stats(guild)
         channel_stats = await self.get_channel_stats(guild)
 
-        # サーバーアイコンのURL
-        server_icon = guild.icon.url if guild.icon else None
-
-        # Embedを作成
-        embed = discord.Embed(
-            title=f"📊 {guild.name} - サーバー統計",
-            description=f"サーバー作成日: {created_at} ({server_age}日前)",
-            color=discord.Color.blue(),
-        )
-
-        if server_icon:
-            embed.set_thumbnail(url=server_icon)
+        report = {
+            "title": f"📊 {guild.name} - サーバー統計",
+            "description": f"サーバー作成日: {created_at} ({server_age}日前)",
+            # サーバーアイコンのURL
+            "thumbnail": guild.icon.url if guild.icon else None,
+            "stats": {
+                "members": member_stats,
+                "roles": role_stats,
+                "channels": channel_stats,
+            },
+            "fields": [],
+            "chart": None,
+            "created_at": now,
+        }
+        fields = report["fields"]
 
         # メンバー情報
-        embed.add_field(
-            name="👥 メンバー情報",
-            value=f"総メンバー数: {member_stats['total']}\n"
-            f"人間: {member_stats['humans']}\n"
-            f"ボット: {member_stats['bots']}\n"
-            f"オンライン: {member_stats['online']}\n"
-            f"モバイルユーザー: {member_stats['mobile_users']}",
-            inline=True,
+        fields.append(
+            {
+                "name": "👥 メンバー情報",
+                "value": f"総メンバー数: {member_stats['total']}\n"
+                f"人間: {format_count(member_stats, 'humans')}\n"
+                f"ボット: {format_count(member_stats, 'bots')}\n"
+                f"オンライン: {format_count(member_stats, 'online')}\n"
+                f"モバイルユーザー: {format_count(member_stats, 'mobile_users')}"
+                + (
+                    f"\n（内訳はキャッシュ済みの{member_stats['cached_members']}人）"
+                    if member_stats.get("approximate")
+                    else ""
+                ),
+                "inline": True,
+            }
         )
 
         # チャンネル情報
-        embed.add_field(
-            name="📝 チャンネル情報",
-            value=f"テキストチャンネル: {channel_stats['text_channels']}\n"
-            f"ボイスチャンネル: {channel_stats['voice_channels']}\n"
-            f"カテゴリー: {channel_stats['categories']}\n"
-            f"合計: {channel_stats['total_channels']}",
-            inline=True,
+        fields.append(
+            {
+                "name": "📝 チャンネル情報",
+                "value": f"テキストチャンネル: {channel_stats['text_channels']}\n"
+                f"ボイスチャンネル: {channel_stats['voice_channels']}\n"
+                f"カテゴリー: {channel_stats['categories']}\n"
+                f"合計: {channel_stats['total_channels']}",
+                "inline": True,
+            }
         )
 
         # ロール情報
-        top_roles = sorted(
-            role_stats["role_counts"].items(), key=lambda x: x[1], reverse=True
-        )[:5]
+        top_roles = role_stats["top_roles"]
+        about = "約" if role_stats.get("approximate") else ""
         top_roles_text = (
-            "\n".join([f"{role}: {count}人" for role, count in top_roles])
+            "\n".join([f"{role}: {about}{count}人" for role, count in top_roles])
             if top_roles
             else "なし"
         )
 
-        embed.add_field(
-            name=f"🏷️ ロール情報 (総数: {role_stats['total_roles']})",
-            value=f"**上位5ロール**\n{top_roles_text}",
-            inline=False,
+        fields.append(
+            {
+                "name": f"🏷️ ロール情報 (総数: {role_stats['total_roles']})",
+                "value": f"**上位5ロール**\n{top_roles_text}",
+                "inline": False,
+            }
         )
 
         # アクティビティ情報をエラーハンドリング付きで取得
         try:
             activity_stats = await self.get_activity_stats(guild)
+            report["stats"]["activities"] = activity_stats
+            about = "約" if activity_stats.get("approximate") else ""
             activities_text = (
                 "\n".join(
                     [
-                        f"{activity}: {count}人"
+                        f"{activity}: {about}{count}人"
                         for activity, count in activity_stats["popular_activities"]
                     ]
                 )
@@ -219,48 +857,135 @@ class ServerStats:
                 else "なし"
             )
 
-            embed.add_field(
-                name="🎮 人気のアクティビティ",
-                value=activities_text or "アクティブなユーザーがいません",
-                inline=False,
+            fields.append(
+                {
+                    "name": "🎮 人気のアクティビティ",
+                    "value": activities_text or "アクティブなユーザーがいません",
+                    "inline": False,
+                }
             )
         except Exception as e:
-            embed.add_field(
-                name="🎮 人気のアクティビティ",
-                value="アクティビティ情報の取得に失敗しました",
-                inline=False,
+            fields.append(
+                {
+                    "name": "🎮 人気のアクティビティ",
+                    "value": "アクティビティ情報の取得に失敗しました",
+                    "inline": False,
+                }
+            )
+
+        # 推定値の場合は、推定の方法と対象を表示する
+        if member_stats.get("approximate"):
+            activity_stats = report["stats"].get("activities", {})
+            note = (
+                f"メンバーが{self.approx_threshold}人以上のため、"
+                f"キャッシュ済みの{member_stats['cached_members']}人から"
+                f"{member_stats['sample_size']}人を抽出した推定値です"
+                "（±はキャッシュ済みのメンバーに対する95%信頼区間）\n"
+                "キャッシュはオンラインのメンバーに偏るため、サーバー全体の値とは異なります"
             )
+            if "distinct_activities" in activity_stats:
+                note += (
+                    f"\nアクティビティの種類: 約{activity_stats['distinct_activities']}種類"
+                    f" (誤差 約{activity_stats['distinct_error'] * 100:.1f}%)"
+                )
+            fields.append({"name": "📐 推定値について", "value": note, "inline": False})
 
         # サーバーのブーストレベルと数
         if guild.premium_tier > 0:
-            embed.add_field(
-                name="🚀 サーバーブースト",
-                value=f"レベル: {guild.premium_tier}\nブースト数: {guild.premium_subscription_count}",
-                inline=True,
+            fields.append(
+                {
+                    "name": "🚀 サーバーブースト",
+                    "value": f"レベル: {guild.premium_tier}\nブースト数: {guild.premium_subscription_count}",
+                    "inline": True,
+                }
+            )
+
+        # メンバーキャッシュの状況
+        if option == "完全":
+            footprint = self.cache_footprint(guild)
+            report["stats"]["cache"] = footprint
+            fields.append(
+                {
+                    "name": "💾 メンバーキャッシュ",
+                    "value": f"キャッシュ済み: {footprint['cached_members']}/{footprint['member_count']}人"
+                    f" ({footprint['coverage'] * 100:.1f}%)\n"
+                    f"オンライン情報: {footprint['presences']}人\n"
+                    f"一覧取得: {'済み' if footprint['chunked'] else '未取得'}",
+                    "inline": True,
+                }
             )
 
         # グラフを作成するかどうか
         if option in ["グラフ", "完全"]:
             try:
                 chart = await self.create_member_chart(member_stats)
-                file = discord.File(chart, filename="member_stats.png")
-                embed.set_image(url="attachment://member_stats.png")
-
-                await interaction.response.send_message(embed=embed, file=file)
+                report["chart"] = chart.getvalue()
             except Exception as e:
-                embed.add_field(
-                    name="エラー",
-                    value=f"グラフの生成に失敗しました: {str(e)}",
-                    inline=False,
+                fields.append(
+                    {
+                        "name": "エラー",
+                        "value": f"グラフの生成に失敗しました: {str(e)}",
+                        "inline": False,
+                    }
                 )
-                await interaction.response.send_message(embed=embed, silent=True)
+
+        return report
+
+    async def create_server_summary(self, interaction, option):
+        """サーバーの統計情報を生成します"""
+        guild = interaction.guild
+        if not await self.ensure_members_cached(interaction):
+            return
+
+        # 有効期間内ならキャッシュを返し、古い場合はそれを返しつつ裏で作り直す
+        key = (guild.id, option)
+        report = await self.report_cache.get(
+            key, lambda: self.build_server_report(guild, option)
+        )
+
+        # Embedを作成
+        embed = discord.Embed(
+            title=report["title"],
+            description=report["description"],
+            color=discord.Color.blue(),
+        )
+
+        if report["thumbnail"]:
+            embed.set_thumbnail(url=report["thumbnail"])
+
+        for field in report["fields"]:
+            embed.add_field(**field)
+
+        # 集計した時刻（キャッシュから返した場合に古さが分かるようにする）
+        embed.set_footer(text="集計時刻")
+        embed.timestamp = report["created_at"]
+
+        if report["chart"] is not None:
+            file = discord.File(
+                io.BytesIO(report["chart"]), filename="member_stats.png"
+            )
+            embed.set_image(url="attachment://member_stats.png")
+
+            await send_response(interaction, embed=embed, file=file)
         else:
-            await interaction.response.send_message(embed=embed, silent=True)
+            await send_response(interaction, embed=embed, silent=True)
 
 
 # コマンド設定関数
 def setup_server_stats_command(tree):
-    stats_instance = ServerStats()  # ここでインスタンス作成
+    # 集計結果のキャッシュ期間を設定ファイルから読み込む（起動時に1回だけ）
+    try:
+        base_dir = os.path.dirname(os.path.abspath(__file__))
+        with open(os.path.join(base_dir, "config.json"), "r", encoding="utf-8") as f:
+            config = json.load(f)
+    except (FileNotFoundError, ValueError):
+        config = {}
+    cache_ttl = config.get("stats_cache_ttl", DEFAULT_TTL)
+    approx_threshold = config.get("approx_member_threshold", APPROX_MEMBER_THRESHOLD)
+
+    stats_instance = ServerStats(
+        cache_ttl=cache_ttl, approx_threshold=approx_threshold
+    )  # ここでインスタンス作成
 
     # サーバー統計コマンドグループ
     stats_group = app_commands.Group(
@@ -273,16 +998,89 @@ def setup_server_stats_command(tree):
             app_commands.Choice(name="基本情報", value="基本"),
             app_commands.Choice(name="グラフ付き", value="グラフ"),
             app_commands.Choice(name="完全な統計", value="完全"),
-        ]
+            app_commands.Choice(name="推移", value="推移"),
+            app_commands.Choice(name="メンバー分析", value="分析"),
+        ],
+        期間=[
+            app_commands.Choice(name="7日間", value=7),
+            app_commands.Choice(name="30日間", value=30),
+            app_commands.Choice(name="365日間", value=365),
+        ],
+    )
+    @app_commands.describe(
+        期間="推移を表示する期間・最近の参加として数える期間（推移・メンバー分析の場合）"
     )
     async def server_stats(
-        interaction: discord.Interaction, 表示オプション: str = "基本"
+        interaction: discord.Interaction, 表示オプション: str = "基本", 期間: int = 7
     ):
         """サーバーの統計情報を表示します"""
+        if 表示オプション == "推移":
+            await stats_instance.send_trend(interaction, 期間)
+            return
+        if 表示オプション == "分析":
+            await stats_instance.send_analytics(interaction, 期間)
+            return
         await stats_instance.create_server_summary(
             interaction, 表示オプション
         )  # インスタンスを使用
 
+    @stats_group.command(
+        name="エクスポート",
+        description="メンバーとロールの一覧をファイルで出力します（サーバー管理権限が必要）",
+    )
+    @app_commands.choices(
+        形式=[
+            app_commands.Choice(name="CSV（gzip圧縮）", value="csv"),
+            app_commands.Choice(name="Parquet", value="parquet"),
+        ]
+    )
+    async def export_stats(interaction: discord.Interaction, 形式: str = "csv"):
+        """メンバーとロールの一覧を出力します"""
+        await stats_instance.send_export(interaction, 形式)
+
+    @stats_group.command(
+        name="ダッシュボード",
+        description="Botが導入されている全サーバーの統計を表示します（開発者のみ）",
+    )
+    async def dashboard(interaction: discord.Interaction):
+        """全サーバーの統計を表示します"""
+        await stats_instance.send_dashboard(interaction)
+
+    @stats_group.command(
+        name="活動", description="チャンネル・時間帯ごとのメッセージ数を表示します"
+    )
+    async def message_activity(interaction: discord.Interaction):
+        """メッセージ数のヒートマップを表示します"""
+        await stats_instance.send_activity(interaction)
+
+    @stats_group.command(
+        name="検索",
+        description="名前の一部・ロール・参加時期でメンバーを検索します",
+    )
+    @app_commands.describe(
+        キーワード="表示名またはユーザー名の一部",
+        ロール="このロールを持つメンバーに絞り込みます",
+        参加期間="この期間内に参加したメンバーに絞り込みます",
+    )
+    @app_commands.choices(
+        参加期間=[
+            app_commands.Choice(name=f"{days}日以内", value=days)
+            for days in JOIN_PERIODS
+        ]
+    )
+    async def search_members(
+        interaction: discord.Interaction,
+        キーワード: str = None,
+        ロール: discord.Role = None,
+        参加期間: int = None,
+    ):
+        """メンバーを検索します"""
+        await stats_instance.send_search(interaction, キーワード, ロール, 参加期間)
+
+    @search_members.autocomplete("キーワード")
+    async def search_autocomplete(interaction: discord.Interaction, current: str):
+        return await stats_instance.member_autocomplete(interaction, current)
+
     @stats_group.command(
         name="ユーザー", description="特定のユーザーの情報を表示します"
     )
@@ -291,6 +1089,9 @@ def setup_server_stats_command(tree):
         interaction: discord.Interaction, メンバー: discord.Member = None
     ):
         """ユーザー情報を表示します"""
+        if not await stats_instance.ensure_members_cached(interaction):
+            return
+
         # ユーザーが指定されていない場合はコマンド実行者の情報を表示
         user = メンバー or interaction.user
 
@@ -427,6 +1228,7 @@ def setup_server_stats_command(tree):
         except:
             pass
 
-        await interaction.response.send_message(embed=embed, silent=True)
+        await send_response(interaction, embed=embed, silent=True)
 
     tree.add_command(stats_group)
+    return stats_instance
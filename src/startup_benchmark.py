@@ -0,0 +1,75 @@
+import importlib
+import importlib.util
+import os
+import sys
+import time
+
+# 起動時間の計測スクリプト
+# 使い方: python startup_benchmark.py
+# モジュールを登録順に読み込み、読み込み時間とメモリ使用量（RSS）の増加を表示する
+# 共通の依存は最初に読み込んだモジュールの分として数える
+
+# 初めて使うときまで読み込みを遅らせている重い依存
+DEFERRED_MODULES = ["PIL.Image", "concurrent.futures.process", "matplotlib.figure"]
+
+
+# 現在のRSS（MB）を返す関数（取得できない環境ではNone）
+def current_rss():
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+
+        # ru_maxrssは最大値（Linuxではキロバイト、macOSではバイト）
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 / (1024 if sys.platform == "darwin" else 1)
+    except ImportError:
+        return None
+
+
+# モジュールを読み込み、(秒, 増加したRSS) を返す関数
+def measure_import(name):
+    before = current_rss()
+    started = time.perf_counter()
+    importlib.import_module(name)
+    elapsed = time.perf_counter() - started
+    after = current_rss()
+    return elapsed, (after - before) if before is not None else None
+
+
+def print_row(name, elapsed, rss):
+    rss_text = f"{rss:8.1f} MB" if rss is not None else "       - MB"
+    print(f"{name:<28} {elapsed * 1000:8.1f} ms {rss_text}")
+
+
+def main():
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from command_registry import COMMAND_MODULES
+
+    print(f"{'モジュール':<23} {'読み込み時間':>10} {'RSS増加':>9}")
+    total = 0.0
+    # discord.pyは全てのモジュールで使うので最初に読み込む
+    for name in ["discord"] + [name for name, _ in COMMAND_MODULES]:
+        elapsed, rss = measure_import(name)
+        total += elapsed
+        print_row(name, elapsed, rss)
+    print(f"{'合計':<26} {total * 1000:8.1f} ms (RSS: {current_rss() or 0:.1f} MB)")
+
+    # 読み込みを遅らせている依存が起動時に読み込まれていないか確認する
+    print("\n初回の使用時に読み込む依存:")
+    for name in DEFERRED_MODULES:
+        if name in sys.modules:
+            print(f"{name:<28} 起動時に読み込まれています")
+        elif importlib.util.find_spec(name.split(".")[0]) is None:
+            print(f"{name:<28} インストールされていません")
+        else:
+            elapsed, rss = measure_import(name)
+            print_row(name, elapsed, rss)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import csv
+import gzip
+import importlib.util
+import io
+import tempfile
+from member_counters import member_role_ids, member_state
+
+# 一度に書き込むメンバー数
+CHUNK_SIZE = 1000
+# メモリ上に置く最大サイズ（超えると一時ファイルに書き出す）
+SPOOL_SIZE = 4 * 1024 * 1024
+# Parquetはpyarrowがある環境でだけ使える
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+MEMBER_COLUMNS = ["id", "bot", "status", "joined_at", "roles"]
+ROLE_COLUMNS = ["id", "name", "members"]
+
+
+# メンバーの行を1行ずつ返すジェネレーター
+def iter_member_rows(members, role_names):
+    for member in members:
+        bot, status, _ = member_state(member)
+        roles = [role_names[role_id] for role_id in member_role_ids(member)]
+        yield (
+            str(member.id),
+            bot,
+            status,
+            member.joined_at.isoformat() if member.joined_at else "",
+            "|".join(sorted(roles)),
+        )
+
+
+# ジェネレーターの行をsize件ずつまとめて返すジェネレーター
+def iter_chunks(rows, size=CHUNK_SIZE):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# CSVをgzipで圧縮しながら書き込み、ファイルオブジェクトを返す関数
+def write_csv_gz(header, rows):
+    fp = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+    with gzip.GzipFile(fileobj=fp, mode="wb") as compressed:
+        # ExcelでもUTF-8として開けるようBOMを付ける
+        text = io.TextIOWrapper(compressed, encoding="utf-8-sig", newline="")
+        writer = csv.writer(text)
+        writer.writerow(header)
+        for chunk in iter_chunks(rows):
+            writer.writerows(chunk)
+        text.flush()
+        text.detach()
+    fp.seek(0)
+    return fp
+
+
+# Parquetに少しずつ書き込み、ファイルオブジェクトを返す関数（pyarrowが必要）
+def write_parquet(header, rows):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    fp = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+    writer = None
+    for chunk in iter_chunks(rows):
+        table = pa.table(
+            {name: [row[i] for row in chunk] for i, name in enumerate(header)}
+        )
+        if writer is None:
+            writer = pq.ParquetWriter(fp, table.schema, compression="zstd")
+        writer.write_table(table)
+    if writer is None:
+        # 行がない場合も列名だけのファイルを作る
+        writer = pq.ParquetWriter(fp, pa.table({name: [] for name in header}).schema)
+    writer.close()
+    fp.seek(0)
+    return fp
+
+
+# メンバーとロールの一覧をファイルに書き出し、(ファイル名, ファイルオブジェクト) のリストを返す関数
+# 時間がかかるのでスレッドで実行する
+def export_guild(members, roles, role_counts, file_format="csv"):
+    role_names = {role.id: role.name for role in roles}
+    member_rows = iter_member_rows(members, role_names)
+    role_rows = (
+        (str(role.id), role.name, role_counts.get(role.id, 0))
+        for role in roles
+        if not role.is_default()
+    )
+
+    if file_format == "parquet":
+        return [
+            ("members.parquet", write_parquet(MEMBER_COLUMNS, member_rows)),
+            ("roles.parquet", write_parquet(ROLE_COLUMNS, role_rows)),
+        ]
+    return [
+        ("members.csv.gz", write_csv_gz(MEMBER_COLUMNS, member_rows)),
+        ("roles.csv.gz", write_csv_gz(ROLE_COLUMNS, role_rows)),
+    ]
+
+
+# ファイルオブジェクトのサイズを返す関数
+def file_size(fp):
+    position = fp.tell()
+    fp.seek(0, io.SEEK_END)
+    size = fp.tell()
+    fp.seek(position)
+    return size
@@ -0,0 +1,217 @@
+import asyncio
+import datetime
+import json
+import os
+import time
+from array import array
+from file_access import file_access
+
+HISTORY_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "Public", "stats_history.json"
+)
+# 日本時間のタイムゾーン
+JST = datetime.timezone(datetime.timedelta(hours=9))
+
+# 記録する項目
+METRICS = ("members", "online", "bots", "roles", "channels")
+# サンプリング間隔（秒）
+SAMPLE_INTERVAL = 300
+# 解像度ごとの (1区間の秒数, 保持する区間数)
+# 古いデータは粗い解像度にだけ残るので、生のサンプルを溜め続けることはない
+RESOLUTIONS = {
+    "raw": (SAMPLE_INTERVAL, 288),  # 5分ごと・1日分
+    "hourly": (3600, 24 * 31),  # 1時間ごと・31日分
+    "daily": (86400, 400),  # 1日ごと・400日分
+}
+
+
+# 一定数の区間だけを保持するリングバッファ（区間内の値は平均する）
+class RingSeries:
+    def __init__(self, step, capacity):
+        self.step = step
+        self.capacity = capacity
+        self.times = array("q", [0]) * capacity  # 区間の開始時刻（UNIX秒）
+        self.counts = array("l", [0]) * capacity  # 区間内のサンプル数
+        self.values = {metric: array("d", [0.0]) * capacity for metric in METRICS}
+        self.head = 0  # 次に書き込む位置
+        self.length = 0
+
+    def _last(self):
+        return (self.head - 1) % self.capacity
+
+    def add(self, timestamp, sample):
+        """サンプルを追加します（同じ区間の場合は平均に含めます）"""
+        bucket = int(timestamp) // self.step * self.step
+        last = self._last()
+        if self.length and self.times[last] == bucket:
+            count = self.counts[last]
+            for metric in METRICS:
+                column = self.values[metric]
+                column[last] += (sample[metric] - column[last]) / (count + 1)
+            self.counts[last] = count + 1
+            return
+
+        # 新しい区間（満杯の場合は最も古い区間を上書きする）
+        index = self.head
+        self.times[index] = bucket
+        self.counts[index] = 1
+        for metric in METRICS:
+            self.values[metric][index] = sample[metric]
+        self.head = (index + 1) % self.capacity
+        self.length = min(self.length + 1, self.capacity)
+
+    def _order(self):
+        start = (self.head - self.length) % self.capacity
+        return [(start + i) % self.capacity for i in range(self.length)]
+
+    def since(self, timestamp):
+        """timestamp以降の (時刻のリスト, 項目ごとの値のリスト) を返します"""
+        indexes = [i for i in self._order() if self.times[i] >= timestamp]
+        times = [self.times[i] for i in indexes]
+        values = {
+            metric: [self.values[metric][i] for i in indexes] for metric in METRICS
+        }
+        return times, values
+
+    def to_dict(self):
+        order = self._order()
+        return {
+            "times": [self.times[i] for i in order],
+            "counts": [self.counts[i] for i in order],
+            "values": {
+                metric: [round(self.values[metric][i], 2) for i in order]
+                for metric in METRICS
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, step, capacity, data):
+        series = cls(step, capacity)
+        # 保持数を超える分は古い方から捨てる
+        times = data["times"][-capacity:]
+        counts = data["counts"][-capacity:]
+        for index, timestamp in enumerate(times):
+            series.times[index] = timestamp
+            series.counts[index] = counts[index]
+        for metric in METRICS:
+            values = data["values"].get(metric, [])[-capacity:]
+            for index, value in enumerate(values):
+                series.values[metric][index] = value
+        series.length = len(times)
+        series.head = series.length % capacity
+        return series
+
+
+# 1サーバー分の推移（解像度ごとのリングバッファ）
+class GuildHistory:
+    def __init__(self, series=None):
+        self.series = series or {
+            name: RingSeries(step, capacity)
+            for name, (step, capacity) in RESOLUTIONS.items()
+        }
+
+    def add(self, timestamp, sample):
+        for series in self.series.values():
+            series.add(timestamp, sample)
+
+    def query(self, days, now=None):
+        """直近days日分の推移を、期間に合った解像度で返します"""
+        if days <= 1:
+            name = "raw"
+        elif days <= 31:
+            name = "hourly"
+        else:
+            name = "daily"
+        now = time.time() if now is None else now
+        return self.series[name].since(now - days * 86400)
+
+
+# 全サーバーの推移を保存用のJSONのバイト列にする関数
+def encode_history(guilds):
+    data = {
+        str(guild_id): {
+            name: series.to_dict() for name, series in history.series.items()
+        }
+        for guild_id, history in guilds
+    }
+    # 数値の配列が長いので、インデントせずに書き込む
+    return json.dumps(data, separators=(",", ":")).encode("utf-8")
+
+
+# サーバー統計の推移を定期的に記録するクラス
+class StatsHistory:
+    def __init__(self, path=HISTORY_PATH, interval=SAMPLE_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self.guilds = {}  # guild_id -> GuildHistory
+        self._task = None
+
+    def record(self, guild_id, sample, timestamp=None):
+        """サーバーの統計値を1件記録します"""
+        history = self.guilds.get(guild_id)
+        if history is None:
+            history = self.guilds[guild_id] = GuildHistory()
+        history.add(time.time() if timestamp is None else timestamp, sample)
+
+    def query(self, guild_id, days):
+        """直近days日分の (日時のリスト, 項目ごとの値のリスト) を返します"""
+        history = self.guilds.get(guild_id)
+        if history is None:
+            return [], {metric: [] for metric in METRICS}
+        times, values = history.query(days)
+        dates = [datetime.datetime.fromtimestamp(t, JST) for t in times]
+        return dates, values
+
+    async def load(self):
+        """保存されている推移を読み込みます"""
+        try:
+            data = await file_access.read_json(self.path)
+        except FileNotFoundError:
+            return
+        except ValueError as e:
+            print(f"統計の推移の読み込みに失敗しました: {e}")
+            return
+        for guild_id, saved in data.items():
+            self.guilds[int(guild_id)] = GuildHistory(
+                {
+                    name: (
+                        RingSeries.from_dict(step, capacity, saved[name])
+                        if name in saved
+                        else RingSeries(step, capacity)
+                    )
+                    for name, (step, capacity) in RESOLUTIONS.items()
+                }
+            )
+
+    def forget_guild(self, guild_id):
+        """サーバーの推移を破棄します（次回の保存でファイルからも消えます）"""
+        self.guilds.pop(guild_id, None)
+
+    async def save(self):
+        """推移をファイルに保存します"""
+        # JSONへの変換は重いのでスレッドで行う
+        # 記録は保存と同じループで行うため、変換中に配列が書き換わることはない
+        encoded = await file_access.run(encode_history, list(self.guilds.items()))
+        await file_access.write_bytes(self.path, encoded)
+
+    async def _run(self, client, collect):
+        while True:
+            for guild in client.guilds:
+                try:
+                    sample = await collect(guild)
+                    if sample is not None:
+                        self.record(guild.id, sample)
+                except Exception as e:
+                    print(f"統計の記録に失敗しました ({guild.id}): {e}")
+            try:
+                await self.save()
+            except OSError as e:
+                print(f"統計の推移の保存に失敗しました: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def start(self, client, collect):
+        """記録ループを開始します（既に動いている場合は何もしません）"""
+        if self._task and not self._task.done():
+            return
+        await self.load()
+        self._task = asyncio.create_task(self._run(client, collect))
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Botのモジュールはsrc直下にあるため、テストからも同じ名前で読み込めるようにする
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "src"))
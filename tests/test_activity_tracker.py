@@ -0,0 +1,29 @@
+import math
+import random
+from collections import Counter
+
+from activity_tracker import CountMinSketch
+
+
+def test_overestimate_stays_within_bound():
+    sketch = CountMinSketch()
+    rng = random.Random(0)
+    counts = Counter(rng.randrange(10**17, 10**18) for _ in range(20000))
+    for key, count in counts.items():
+        sketch.add(key, count)
+
+    total = sum(counts.values())
+    # 誤差は確率 1 - e^-depth 以上で e * 総数 / width 以下になる
+    bound = math.e * total / sketch.width
+    over = [sketch.estimate(key) - count for key, count in counts.items()]
+    assert min(over) >= 0
+    violations = sum(error > bound for error in over)
+    assert violations / len(over) <= math.exp(-sketch.depth) * 2
+
+
+def test_rows_are_independent():
+    sketch = CountMinSketch()
+    keys = range(1, 5001)
+    cells = Counter(tuple(sketch._cells(key)) for key in keys)
+    # 全ての段で同じ枠に入る組がほとんどないこと
+    assert sum(count - 1 for count in cells.values()) <= 5
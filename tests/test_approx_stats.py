@@ -0,0 +1,16 @@
+import math
+
+from approx_stats import Z_95, estimate_count
+
+
+def test_margin_uses_finite_population_correction():
+    estimate, margin = estimate_count(1000, 4096, 10000)
+    assert estimate == round(1000 / 4096 * 10000)
+    share = 1000 / 4096
+    uncorrected = Z_95 * math.sqrt(share * (1 - share) / 4096) * 10000
+    assert 0 < margin < uncorrected
+
+
+def test_no_margin_when_sample_covers_cache():
+    # キャッシュ済みのメンバーを全員サンプルに含む場合は誤差がない
+    assert estimate_count(300, 4000, 4000) == (300, 0)
@@ -0,0 +1,73 @@
+import asyncio
+from types import SimpleNamespace
+
+import discord
+
+import member_counters
+from member_counters import GuildCounters, MemberCounters
+
+
+class FakeGuild:
+    def __init__(self, count):
+        self.id = 1
+        self._members = {}
+        for member_id in range(count):
+            self.add(member_id, discord.Status.offline)
+
+    def add(self, member_id, status):
+        member = SimpleNamespace(
+            id=member_id, guild=self, bot=False, status=status, roles=[]
+        )
+        self._members[member_id] = member
+        return member
+
+    @property
+    def members(self):
+        return list(self._members.values())
+
+
+def totals(counters):
+    return counters.humans, dict(counters.status_counts)
+
+
+def test_events_during_seeding(monkeypatch):
+    monkeypatch.setattr(member_counters, "SEED_BATCH", 10)
+    guild = FakeGuild(100)
+
+    async def scenario():
+        counters = MemberCounters(flush_delay=0)
+        task = asyncio.create_task(counters.load(guild))
+        # 最初のバッチを数えたところで、数えた・数えていないメンバーの両方を変更する
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        for member_id in (0, 99):
+            # discord.pyはキャッシュのメンバーをその場で更新し、変更前はコピーを渡す
+            member = guild._members[member_id]
+            before = SimpleNamespace(**vars(member))
+            member.status = discord.Status.online
+            counters.on_presence_update(before, member)
+        counters.on_member_remove(guild._members.pop(98))
+        counters.on_member_remove(guild._members.pop(1))
+        counters.on_member_join(guild.add(100, discord.Status.online))
+        return await task
+
+    seeded = asyncio.run(scenario())
+    assert totals(seeded) == totals(GuildCounters(guild.members))
+
+
+def test_forget_guild_during_seeding(monkeypatch):
+    monkeypatch.setattr(member_counters, "SEED_BATCH", 10)
+    guild = FakeGuild(100)
+
+    async def scenario():
+        counters = MemberCounters()
+        task = asyncio.create_task(counters.load(guild))
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        counters.forget_guild(guild.id)
+        await task
+        return counters
+
+    counters = asyncio.run(scenario())
+    assert guild.id not in counters._guilds
+    assert guild.id not in counters._seeding
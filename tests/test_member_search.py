@@ -0,0 +1,31 @@
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from member_search import GuildSearchIndex
+
+
+def make_member(member_id, display_name, name):
+    return SimpleNamespace(
+        id=member_id,
+        display_name=display_name,
+        name=name,
+        roles=[],
+        joined_at=datetime(2025, 1, 1, tzinfo=timezone.utc),
+    )
+
+
+def test_single_character_substring():
+    index = GuildSearchIndex(
+        [make_member(1, "山田花子", "hanako"), make_member(2, "佐藤太郎", "taro")]
+    )
+    # n-gramより短い検索語でも名前の途中に含まれていれば見つかる
+    assert index.search("花") == [1]
+    assert index.search("郎") == [2]
+    assert index.search("x") == []
+
+
+def test_prefix_before_substring():
+    index = GuildSearchIndex(
+        [make_member(1, "山田花子", "hanako"), make_member(2, "花村", "hanamura")]
+    )
+    assert index.search("花") == [2, 1]
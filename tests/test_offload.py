@@ -0,0 +1,32 @@
+import asyncio
+import threading
+
+import pytest
+
+from offload import OffloadExecutor, OffloadQueueFull
+
+
+def test_timed_out_job_keeps_its_slot():
+    release = threading.Event()
+
+    async def scenario():
+        executor = OffloadExecutor(max_pending=1, timeout=0.05, use_processes=False)
+        with pytest.raises(asyncio.TimeoutError):
+            await executor.run(release.wait)
+        # 待つのを諦めてもワーカーの処理は続いているので、上限を超えて投入できない
+        assert executor.stats()["inflight"] == 1
+        with pytest.raises(OffloadQueueFull):
+            await executor.run(release.wait)
+
+        release.set()
+        for _ in range(100):
+            if executor.stats()["inflight"] == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert executor.stats()["inflight"] == 0
+        assert await executor.run(sum, [1, 2, 3]) == 6
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        release.set()
@@ -0,0 +1,51 @@
+import sqlite3
+
+from seminar_db import SeminarDatabase
+
+ITEMS = [{"date": "2025-06-01", "time": "", "subject": "卒業研究", "number": "第1回"}]
+
+
+def test_version_increases_across_delete(tmp_path):
+    db = SeminarDatabase(str(tmp_path / "seminar.db"))
+    db.import_entries(1, "卒研", ITEMS)
+    before = db.get_course(1, "卒研").version
+
+    assert db.delete_course(1, "卒研")
+    db.import_entries(1, "卒研", ITEMS)
+    # 削除前と同じバージョンだと表示のキャッシュが古い内容を返してしまう
+    assert db.get_course(1, "卒研").version > before
+
+
+def test_version_survives_restart(tmp_path):
+    path = str(tmp_path / "seminar.db")
+    db = SeminarDatabase(path)
+    db.import_entries(1, "卒研", ITEMS)
+    before = db.get_course(1, "卒研").version
+    db.delete_course(1, "卒研")
+
+    db = SeminarDatabase(path)
+    db.import_entries(1, "卒研", ITEMS)
+    assert db.get_course(1, "卒研").version > before
+
+
+def test_counter_starts_after_existing_versions(tmp_path):
+    path = str(tmp_path / "seminar.db")
+    # 通し番号の導入前に作られたデータベース
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE courses (guild_id INTEGER NOT NULL, course TEXT NOT NULL, "
+        "description TEXT NOT NULL DEFAULT '', version INTEGER NOT NULL DEFAULT 0, "
+        "PRIMARY KEY (guild_id, course))"
+    )
+    conn.execute("INSERT INTO courses VALUES (1, '卒研', '', 5)")
+    conn.commit()
+    conn.close()
+
+    db = SeminarDatabase(path)
+    db.import_entries(1, "別コース", ITEMS)
+    assert db.get_course(1, "別コース").version == 6
+
+
+def test_delete_missing_course(tmp_path):
+    db = SeminarDatabase(str(tmp_path / "seminar.db"))
+    assert not db.delete_course(1, "存在しないコース")
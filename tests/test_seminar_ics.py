@@ -0,0 +1,38 @@
+import re
+
+from seminar_ics import IcsCache
+
+ITEMS = [
+    {
+        "date": "2025-06-01",
+        "time": "10:00-11:30",
+        "subject": "卒業研究",
+        "number": "第1回",
+    },
+    {
+        "date": "2025-06-08",
+        "time": "10:00-11:30",
+        "subject": "卒業研究",
+        "number": "第2回",
+    },
+    {"date": "2025-06-08", "time": "", "subject": "輪講", "number": ""},
+    {"date": "2025-06-08", "time": "", "subject": "輪講", "number": ""},
+]
+
+
+def uids(items, key="default"):
+    data = IcsCache._build(items, "ゼミ日程", key).decode("utf-8")
+    return re.findall(r"^UID:(.*)\r$", data, re.MULTILINE)
+
+
+def test_uids_survive_added_entry():
+    added = {"date": "2025-06-05", "time": "", "subject": "中間発表", "number": ""}
+    before = uids(ITEMS)
+    after = uids(ITEMS[:1] + [added] + ITEMS[1:])
+    # 予定を1件追加しても、既存の予定のUIDは変わらない
+    assert set(before) < set(after)
+    assert len(set(after)) == len(after) == len(ITEMS) + 1
+
+
+def test_uids_differ_between_courses():
+    assert not set(uids(ITEMS, ("db", 1, "A"))) & set(uids(ITEMS, ("db", 1, "B")))
@@ -0,0 +1,56 @@
+from datetime import date, timedelta
+
+import pytest
+
+from seminar_db import SeminarDatabase
+from seminar_store import ScheduleSnapshot, parse_entry
+
+TODAY = date(2025, 6, 1)
+PAGE_SIZE = 10
+
+
+# 過去6件・今後7件の計13件の日程
+def make_items():
+    return [
+        {
+            "date": (TODAY + timedelta(days=7 * (i - 6))).isoformat(),
+            "time": "2限目（10:40 ~ 12:10）",
+            "subject": "卒業研究",
+            "number": f"第{i + 1}回",
+        }
+        for i in range(13)
+    ]
+
+
+@pytest.fixture(params=["snapshot", "database"])
+def source(request, tmp_path):
+    items = make_items()
+    if request.param == "snapshot":
+        return ScheduleSnapshot([parse_entry(item) for item in items], 1, items)
+    db = SeminarDatabase(str(tmp_path / "seminar.db"))
+    db.import_entries(1, "卒研", items)
+    return db.get_course(1, "卒研")
+
+
+def numbers(entries):
+    return [entry.number for entry in entries]
+
+
+def test_pages_split_upcoming_and_past(source):
+    upcoming, past = source.list_page(TODAY, 0, PAGE_SIZE)
+    assert numbers(upcoming) == [f"第{i}回" for i in range(7, 14)]
+    assert numbers(past) == ["第1回", "第2回", "第3回"]
+
+    upcoming, past = source.list_page(TODAY, PAGE_SIZE, 2 * PAGE_SIZE)
+    # 2ページ目に今後の予定が過去の予定として出てこないこと
+    assert numbers(upcoming) == []
+    assert numbers(past) == ["第4回", "第5回", "第6回"]
+
+
+def test_pages_cover_every_entry_once(source):
+    seen = []
+    for start in range(0, 13, 4):
+        upcoming, past = source.list_page(TODAY, start, start + 4)
+        seen.extend(numbers(upcoming) + numbers(past))
+    assert sorted(seen) == sorted(f"第{i}回" for i in range(1, 14))
+    assert len(seen) == 13
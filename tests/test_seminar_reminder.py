@@ -0,0 +1,144 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from seminar_reminder import SeminarReminderScheduler
+from seminar_store import JST, ScheduleSnapshot, parse_entry
+
+GUILD_ID = 1
+CHANNEL_ID = 10
+FIRST = {"date": "2025-06-02", "time": "10:00-11:30", "subject": "卒研", "number": "1"}
+SECOND = {"date": "2025-06-09", "time": "10:00-11:30", "subject": "卒研", "number": "2"}
+
+
+class FakeStore:
+    def __init__(self, items):
+        self.version = 0
+        self.set(items)
+
+    def set(self, items):
+        self.version += 1
+        entries = sorted((parse_entry(item) for item in items), key=lambda e: e.date)
+        self.snapshot = ScheduleSnapshot(entries, self.version, items)
+
+    async def get(self):
+        return self.snapshot
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def make_scheduler(tmp_path, store, clock, sent):
+    async def send(guild_id, channel_id, entry, minutes):
+        sent.append((guild_id, channel_id, entry.number, clock()))
+
+    return SeminarReminderScheduler(
+        store=store,
+        settings_path=str(tmp_path / "reminder.json"),
+        clock=clock,
+        send=send,
+    )
+
+
+def at(day, hour, minute=0):
+    return datetime(2025, 6, day, hour, minute, tzinfo=JST)
+
+
+def test_fires_once_before_start(tmp_path):
+    sent = []
+    clock = FakeClock(at(1, 12))
+    store = FakeStore([FIRST, SECOND])
+
+    async def scenario():
+        scheduler = make_scheduler(tmp_path, store, clock, sent)
+        await scheduler.configure(GUILD_ID, CHANNEL_ID, 30)
+        delay = await scheduler.run_once()
+        assert sent == []
+        assert delay > 0
+
+        clock.now = at(2, 9, 29)
+        await scheduler.run_once()
+        assert sent == []
+
+        clock.now = at(2, 9, 30)
+        await scheduler.run_once()
+        await scheduler.run_once()
+        clock.now = at(2, 9, 45)
+        await scheduler.run_once()
+        assert sent == [(GUILD_ID, CHANNEL_ID, "1", at(2, 9, 30))]
+        assert scheduler.next_fire_at(GUILD_ID) == at(9, 9, 30)
+
+    asyncio.run(scenario())
+
+
+def test_past_fire_time_is_not_sent_after_restart(tmp_path):
+    sent = []
+    clock = FakeClock(at(1, 12))
+    store = FakeStore([FIRST, SECOND])
+
+    async def scenario():
+        await make_scheduler(tmp_path, store, clock, sent).configure(
+            GUILD_ID, CHANNEL_ID, 30
+        )
+        # 通知時刻を過ぎてから再起動した場合は、その通知は送らない
+        clock.now = at(2, 9, 40)
+        scheduler = make_scheduler(tmp_path, store, clock, sent)
+        await scheduler.load_settings()
+        await scheduler.run_once()
+        assert sent == []
+        assert scheduler.next_fire_at(GUILD_ID) == at(9, 9, 30)
+
+    asyncio.run(scenario())
+
+
+def test_removed_entry_is_dropped(tmp_path):
+    sent = []
+    clock = FakeClock(at(1, 12))
+    store = FakeStore([FIRST, SECOND])
+
+    async def scenario():
+        scheduler = make_scheduler(tmp_path, store, clock, sent)
+        await scheduler.configure(GUILD_ID, CHANNEL_ID, 30)
+        await scheduler.run_once()
+
+        store.set([SECOND])
+        await scheduler.run_once()
+        assert scheduler.next_fire_at(GUILD_ID) == at(9, 9, 30)
+        clock.now = at(2, 10)
+        await scheduler.run_once()
+        assert sent == []
+
+    asyncio.run(scenario())
+
+
+def test_configure_and_disable_reschedule(tmp_path):
+    sent = []
+    clock = FakeClock(at(1, 12))
+    store = FakeStore([FIRST, SECOND])
+
+    async def scenario():
+        scheduler = make_scheduler(tmp_path, store, clock, sent)
+        await scheduler.configure(GUILD_ID, CHANNEL_ID, 30)
+        await scheduler.run_once()
+        assert scheduler.next_fire_at(GUILD_ID) == at(2, 9, 30)
+
+        # 通知タイミングを変えると、古い時刻の通知は送られない
+        await scheduler.configure(GUILD_ID, CHANNEL_ID, 60)
+        assert scheduler.next_fire_at(GUILD_ID) == at(2, 9)
+        clock.now = at(2, 9)
+        await scheduler.run_once()
+        clock.now = at(2, 9, 30)
+        await scheduler.run_once()
+        assert sent == [(GUILD_ID, CHANNEL_ID, "1", at(2, 9))]
+
+        await scheduler.disable(GUILD_ID)
+        assert scheduler.next_fire_at(GUILD_ID) is None
+        clock.now = at(9, 10)
+        await scheduler.run_once()
+        assert len(sent) == 1
+
+    asyncio.run(scenario())